@@ -8,6 +8,10 @@ a = Analysis(
     datas=[],
     hiddenimports=[
         'maxroll_scraper',
+        'nyanko_builds',
+        'nyanko_scoring',
+        'nyanko_sqlite',
+        'nyanko_storage',
         'rich',
         'rich._unicode_data.unicode4-1-0', 'rich._unicode_data.unicode5-0-0', 'rich._unicode_data.unicode5-1-0', 'rich._unicode_data.unicode5-2-0',
         'rich._unicode_data.unicode6-0-0', 'rich._unicode_data.unicode6-1-0', 'rich._unicode_data.unicode6-2-0', 'rich._unicode_data.unicode6-3-0',
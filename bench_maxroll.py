@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the maxroll_scraper extractors (no network).
+
+Generates synthetic guide pages (default 100KB, 1MB, 10MB; plain, with __NEXT_DATA__,
+with many large <script> blocks, and tag-dense markup like Maxroll's), times each extractor on them, records peak
+memory with tracemalloc, and writes machine-readable JSON so runs can be compared:
+
+  python bench_maxroll.py                          # writes bench_results.json
+  python bench_maxroll.py --sizes 100K,1M --repeat 3 --out before.json
+  python bench_maxroll.py --out after.json --compare before.json
+  python bench_maxroll.py --check-linear           # quick pass/fail: section rules stay linear
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import tracemalloc
+
+import maxroll_scraper as ms
+
+
+WORDS = (
+    "the build focuses on burst damage while keeping uptime on buffs during raid phases "
+    "rotate skills after the opener and keep imagine cooldowns aligned with the boss "
+    "shield break window use dodge to reset the combo and weave basic attacks between casts"
+).split()
+
+SECTIONS_HTML = (
+    '<h2 id="gearing">Gearing</h2>'
+    "<p>Prioritise these attributes on every piece:</p>"
+    "<ol><li>1. Intellect</li><li>2. Luck</li><li>3. Versatility</li><li>4. Crit</li></ol>"
+    "<p>For legendary affixes, focus on Cast Speed, then MATK, and Intellect as the last.</p>"
+    "<ol><li>1. Cast Speed</li><li>2. MATK</li><li>3. Intellect</li></ol>"
+    '<h2 id="consumables">Consumables</h2>'
+    "<p>Food: Grilled Seafood Platter</p><p>Serum: Azure Focus Serum</p>"
+    "<p>To learn more about life skills, see the Culinary guide.</p>"
+)
+
+SIZES = {"100K": 100 * 1024, "1M": 1024 * 1024, "10M": 10 * 1024 * 1024}
+VARIANTS = ("plain", "next_data", "many_scripts", "tag_dense")
+
+# Adversarial inputs for extract_sections_from_text: anchors everywhere, no complete match
+ADVERSARIAL = {
+    "no_anchors": "lorem ipsum dolor sit amet ",
+    "food_without_serum": "Food: cake ",
+    "serum_without_end": "Serum: x ",
+    "numbered_without_4": "1. a 2. b 3. c ",
+    "focus_without_last": "focus on a, then b, and c ",
+}
+
+# --check-linear inputs: the unterminated ones above plus anchor-dense text (a rule anchor every
+# few chars), each followed by LINEAR_TAIL so required keywords exist, but only at the very end
+LINEAR_INPUTS = dict(
+    {k: v for k, v in ADVERSARIAL.items() if k != "no_anchors"},
+    anchor_dense_numbers="1.1.1.",
+    anchor_dense_food="food ",
+    anchor_dense_affix="for legendary affixes, focus on ",
+)
+LINEAR_TAIL = " serum 4. 3. crit as the last"
+
+
+def _sentence(rng):
+    n = rng.randint(8, 24)
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _gear_piece(rng, i):
+    return {
+        "slot": ("Weapon", "Helmet", "Chest", "Gloves", "Boots", "Earring", "Necklace", "Ring",
+                 "Bracelet L", "Bracelet R", "Charm", "Belt")[i % 12],
+        "name": "Piece %d of the Azure Sage" % i,
+        "basicAttributes": {"ATK": rng.randint(100, 400), "Intellect": rng.randint(20, 90)},
+        "advancedAttributes": {"Crit": rng.randint(1, 9), "Luck": rng.randint(1, 9)},
+        "imageUrl": "https://assets.maxroll.gg/bp/items/%d.webp" % i,
+    }
+
+
+def _next_data(rng, target):
+    """__NEXT_DATA__ JSON of about target chars: 12 gear pieces buried in unrelated page data."""
+    equipment = [_gear_piece(rng, i) for i in range(12)]
+    nav = []
+    data = {"props": {"pageProps": {"nav": nav, "build": {"name": "Sample", "equipment": equipment}}}}
+    size = len(json.dumps(data))
+    i = 0
+    while size < target:
+        item = {"name": "Article %d" % i, "title": _sentence(rng), "tags": [{"name": w} for w in WORDS[:5]]}
+        nav.append(item)
+        size += len(json.dumps(item)) + 2
+        i += 1
+    return json.dumps(data)
+
+
+def _big_script(rng, target):
+    """Large inline script that mentions equipment and holds gear-like JSON objects."""
+    parts = ["window.__APOLLO_STATE__ = {\"equipment\": ["]
+    size = 0
+    i = 0
+    while size < target:
+        blob = json.dumps(_gear_piece(rng, i))
+        parts.append(blob + ",")
+        size += len(blob) + 1
+        i += 1
+    parts.append("]};")
+    return "".join(parts)
+
+
+def make_page(size, variant="plain", seed=1):
+    """Synthetic guide page of roughly size chars for one of VARIANTS."""
+    rng = random.Random(seed)
+    head = [
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">",
+        "<title>Azure Sage Smite Spec Guide - Blue Protocol - Maxroll.gg</title>",
+        "<style>.guide{max-width:960px} .tip{color:#fc0}</style>",
+        "<script>window.dataLayer=window.dataLayer||[];</script>",
+    ]
+    tail = []
+    if variant == "next_data":
+        blob = _next_data(rng, size * 3 // 10)
+        tail.append('<script id="__NEXT_DATA__" type="application/json">%s</script>' % blob)
+    elif variant == "many_scripts":
+        n = 40
+        for _ in range(n):
+            script = _big_script(rng, size // (2 * n))
+            head.append("<script>%s</script>" % script)
+
+    body = ['</head><body><nav><a href="/blue-protocol">Home</a></nav><main class="guide">',
+            '<span class="sr-planner-equipment" data-sr-id="g41si0c5"></span>']
+    used = sum(map(len, head)) + sum(map(len, body)) + sum(map(len, tail))
+    fill = max(0, size - used)
+    written = 0
+    placed = False
+    while written < fill:
+        if variant == "tag_dense":
+            # Component markup: a few words per element, every element with classes/data attributes
+            para = "".join(
+                '<div class="flex items-center gap-2 _c%d" data-idx="%d"><span class="text-sm">%s</span>'
+                '<a href="/blue-protocol/items/%d">%s &amp; %s</a></div>'
+                % (i % 50, i, rng.choice(WORDS), i, rng.choice(WORDS), rng.choice(WORDS)) for i in range(20)
+            ) + "\n"
+        else:
+            para = "<p class=\"tip\">%s <b>%s</b> &amp; %s</p>\n" % (_sentence(rng), rng.choice(WORDS), _sentence(rng))
+        body.append(para)
+        written += len(para)
+        if not placed and written >= fill // 2:
+            body.append(SECTIONS_HTML)
+            placed = True
+    if not placed:
+        body.append(SECTIONS_HTML)
+    body.append("</main></body>")
+    return "".join(head + body + tail + ["</html>"])
+
+
+def _time(fn, arg, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        runs.append(time.perf_counter() - t0)
+    return min(runs), statistics.median(runs)
+
+
+def _peak(fn, arg):
+    tracemalloc.start()
+    try:
+        fn(arg)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _extractors(page):
+    """(name, fn, arg) for every extractor, with inputs prepared the way scrape_guide does."""
+    tokens = ms.tokenize_guide(page)
+    return [
+        ("tokenize_guide", ms.tokenize_guide, page),
+        ("extract_sections_from_text", ms.extract_sections_from_text, tokens.text),
+        ("extract_gear_from_scripts", ms.extract_gear_from_scripts, tokens.scripts),
+        ("extract_gear_from_html", ms.extract_gear_from_html, page),
+        ("extract_planner_build_id", ms.extract_planner_build_id, page),
+        ("parse_guide_html", lambda html: ms.parse_guide_html("https://maxroll.gg/blue-protocol/build-guides/x", html), page),
+    ]
+
+
+def run(sizes, variants, repeat, adversarial_size):
+    results = []
+
+    def record(case, size, name, fn, arg):
+        best, median = _time(fn, arg, repeat)
+        peak = _peak(fn, arg)
+        results.append({
+            "case": case, "size": size, "extractor": name,
+            "ms_min": round(best * 1000, 2), "ms_median": round(median * 1000, 2),
+            "peak_kb": round(peak / 1024, 1),
+        })
+        print("  %-28s %-26s %9.2f ms  %9.1f KB" % (case, name, best * 1000, peak / 1024), flush=True)
+
+    for label in sizes:
+        for variant in variants:
+            page = make_page(SIZES[label], variant)
+            case = "%s/%s" % (label, variant)
+            print("%s (%d chars)" % (case, len(page)), flush=True)
+            for name, fn, arg in _extractors(page):
+                record(case, len(page), name, fn, arg)
+
+    if adversarial_size:
+        print("adversarial extract_sections_from_text (%d chars)" % adversarial_size, flush=True)
+        for name, unit in ADVERSARIAL.items():
+            text = unit * (adversarial_size // len(unit))
+            record("adversarial/" + name, len(text), "extract_sections_from_text", ms.extract_sections_from_text, text)
+    return results
+
+
+def check_linear(size, factor=4, limit=8.0, repeat=3):
+    """
+    Time extract_sections_from_text on every LINEAR_INPUTS text at size and factor * size
+    chars; linear growth is about factor x. Returns the names that grew more than limit x.
+    """
+    failed = []
+    print("extract_sections_from_text at %d and %d chars (limit x%.1f)" % (size, size * factor, limit))
+    for name, unit in LINEAR_INPUTS.items():
+        small = unit * (size // len(unit)) + LINEAR_TAIL
+        large = unit * (size * factor // len(unit)) + LINEAR_TAIL
+        t_small = _time(ms.extract_sections_from_text, small, repeat)[0]
+        t_large = _time(ms.extract_sections_from_text, large, repeat)[0]
+        ratio = t_large / t_small if t_small else 0.0
+        flag = ""
+        if ratio > limit:
+            flag = "  <-- not linear"
+            failed.append(name)
+        print("  %-26s %9.2f ms %9.2f ms  x%.1f%s" % (name, t_small * 1000, t_large * 1000, ratio, flag))
+    return failed
+
+
+def compare(results, baseline, threshold, min_ms):
+    """Print ms_min ratios against a previous run; returns the number of regressions.
+
+    Timings below min_ms and peaks below 64KB in both runs are never flagged (noise).
+    """
+    old = {(r["case"], r["extractor"]): r for r in baseline.get("results", [])}
+    regressions = 0
+    print("\ncompared with baseline (ratio = new / old ms_min, peak)")
+    for r in results:
+        prev = old.get((r["case"], r["extractor"]))
+        if not prev or not prev["ms_min"]:
+            continue
+        ratio = r["ms_min"] / prev["ms_min"]
+        mem = r["peak_kb"] / prev["peak_kb"] if prev["peak_kb"] else 1.0
+        flag = ""
+        slow = ratio > threshold and max(r["ms_min"], prev["ms_min"]) >= min_ms
+        grew = mem > threshold and max(r["peak_kb"], prev["peak_kb"]) >= 64
+        if slow or grew:
+            flag = "  <-- regression"
+            regressions += 1
+        print("  %-28s %-26s x%.2f time  x%.2f peak%s" % (r["case"], r["extractor"], ratio, mem, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for maxroll_scraper extractors")
+    parser.add_argument("--sizes", default="100K,1M,10M", help="comma list of %s" % ",".join(SIZES))
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="comma list of %s" % ",".join(VARIANTS))
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per extractor (min and median kept)")
+    parser.add_argument("--adversarial-size", type=int, default=10 * 1024 * 1024,
+                        help="chars of each adversarial section input (0 to skip)")
+    parser.add_argument("--out", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="ratio that counts as a regression")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ignore time regressions below this")
+    parser.add_argument("--check-linear", action="store_true",
+                        help="only check that section extraction time grows linearly (exit 1 if not)")
+    args = parser.parse_args(argv)
+
+    if args.check_linear:
+        return 1 if check_linear(128 * 1024) else 0
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    variants = [v for v in args.variants.split(",") if v]
+    for s in sizes:
+        if s not in SIZES:
+            parser.error("unknown size %r" % s)
+    for v in variants:
+        if v not in VARIANTS:
+            parser.error("unknown variant %r" % v)
+
+    results = run(sizes, variants, max(1, args.repeat), args.adversarial_size)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "extractor_version": ms.EXTRACTOR_VERSION,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("\nwrote %s (%d results)" % (args.out, len(results)))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold, args.min_ms):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,92 +6,1295 @@ Scrape from Maxroll Blue Protocol build guide URL:
 - Interactive gear: equipment slots + image URLs when present in page (often JS-loaded).
 """
 
+import io
+import os
+import base64
+import sys
+import codecs
 import re
 import json
-import urllib.request
+import time
+import random
+import socket
+import asyncio
+import argparse
+import zlib
+import mmap
+import tempfile
+import hashlib
+import logging
+import contextlib
+import collections
+import threading
+import concurrent.futures
+import http.client
 import urllib.error
-from html.parser import HTMLParser
+import urllib.parse
+import urllib.request
+from html import unescape
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+from nyanko_storage import FileLock, write_atomic
+
+
+log = logging.getLogger("maxroll_scraper")
 
 
 MAXROLL_BASE = "https://maxroll.gg"
 USER_AGENT = "NyankoProtocol/1.0 (Blue Protocol build tracker)"
+PLANNER_URL = MAXROLL_BASE + "/blue-protocol/planner/{}"
+# Brotli only when the optional brotli / brotlicffi module is installed
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
 
+# Disk cache for fetched pages (same folder as the app's checklist.json)
+CACHE_DIR = os.path.join(os.environ.get("APPDATA", "."), "NyankoProtocol", "cache")
+CACHE_TTL = 30 * 60                 # serve without any request while younger than this
+CACHE_MAX_AGE = 14 * 24 * 3600      # evict entries not re-validated for this long
+CACHE_MAX_BYTES = 64 * 1024 * 1024  # total body size before least-recently-used eviction
 
-def fetch_url(url, timeout=15):
-    """Fetch URL and return decoded HTML string."""
-    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return resp.read().decode("utf-8", errors="replace")
+# Parsed-result memo: bump EXTRACTOR_VERSION whenever an extractor's output changes
+EXTRACTOR_VERSION = 3
+MEMO_DIR = os.path.join(CACHE_DIR, "parsed")
+MEMO_MAX_MEMORY = 32
+MEMO_MAX_DISK = 256
 
+# Snapshot archive of every fetched body (guides and planners), for offline re-extraction
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = os.path.join(CACHE_DIR, "archive")
+ARCHIVE_COMPRESS_LEVEL = 6
+ARCHIVE_MAX_BYTES = 64 * 1024 * 1024    # snapshots.dat size that triggers a compaction
+ARCHIVE_KEEP_PER_URL = 5                # snapshots per URL a compaction keeps (fewer if still over)
 
-def extract_sections_from_text(full_text):
+POOL_MAX_IDLE_PER_HOST = 4
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# Errors that mean a kept-alive socket was closed by the server while idle
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError,
+)
+
+# asyncio engine: bounded concurrency, per-host token bucket, jittered exponential retry
+ASYNC_CONCURRENCY = 4
+ASYNC_RATE_PER_HOST = 2.0   # requests per second, sustained
+ASYNC_BURST_PER_HOST = 4
+ASYNC_RETRIES = 3
+ASYNC_BACKOFF_BASE = 0.5    # seconds; doubled per attempt, +/-50% jitter
+ASYNC_BACKOFF_MAX = 10.0
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+PARSE_CHUNK_SIZE = 64 * 1024
+GEAR_MAX_SLOTS = 64
+# Keys whose subtrees hold gear (equipment, gearSlots, loadout, ...); nothing else in __NEXT_DATA__ is walked
+EQUIPMENT_KEY_RE = re.compile(r"equip|gear|loadout", re.IGNORECASE)
+# Scans for the keyword part of such a key; the key's opening quote is then found with rfind
+NEXT_DATA_EQUIPMENT_RE = re.compile(r'(?=[EeGgLl])(?:[Ee]quip|[Gg]ear|[Ll]oadout)[A-Za-z_]*"\s*:\s*')
+NEXT_DATA_KEY_PREFIX_RE = re.compile(r"[A-Za-z_]*")
+FETCH_CHUNK_SIZE = 64 * 1024
+FETCH_MAX_BYTES = 16 * 1024 * 1024
+EARLY_EXIT_CHECK_BYTES = 256 * 1024  # first completeness check; the interval doubles after each miss
+PLANNER_ID_RE = re.compile(r"[a-zA-Z0-9]+")
+PLANNER_LINK_RE = re.compile(r"/planner/([a-zA-Z0-9]+)(?=[\"'\s>]|$)")
+
+
+class HTTPCache:
     """
-    Extract only:
-    - Attributes priority list (1. Intellect 2. Luck ...)
-    - Legendary Affix list (1. Cast Speed 2. MATK 3. Intellect)
-    - Food and Serum.
-    No long gearing paragraphs (Embeds, Modules, Emblem, Set).
+    Disk-backed response cache keyed by URL.
+    Each entry is <sha1(url)>.json (url, etag, last_modified, fetched_at, size) + <sha1(url)>.body.
+    The .body mtime is bumped on every hit and used for LRU eviction. put() and evict() hold
+    cache.lock (and a thread lock), so fetch threads and other running instances never evict
+    an entry that is still being written.
     """
-    text = full_text.replace("\r\n", "\n").replace("\r", "\n")
-    gearing_parts = []
-    food = ""
-    serum = ""
 
-    # Attributes: "1. Intellect 2. Luck ..." or after stripping tags "Intellect Luck Versatility Crit"
-    attrs_m = re.search(
-        r"1\.\s*(\w+)\s+2\.\s*(\w+)\s+3\.\s*(\w+)\s+4\.\s*(\w+)(?=\s|\.|Legendary|$)",
-        text,
-        re.IGNORECASE,
-    )
-    if attrs_m:
-        gearing_parts.append("Attributes: 1. %s  2. %s  3. %s  4. %s" % attrs_m.groups())
+    def __init__(self, root=CACHE_DIR, ttl=CACHE_TTL, max_age=CACHE_MAX_AGE, max_bytes=CACHE_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(root, "cache.lock"))
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key)
+        return base + ".json", base + ".body"
+
+    def get(self, url):
+        """Return the entry's metadata dict, or None when missing/unreadable."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not os.path.exists(body_path):
+            return None
+        if time.time() - meta.get("fetched_at", 0) > self.max_age:
+            self.delete(url)
+            return None
+        return meta
+
+    def is_fresh(self, meta):
+        return time.time() - meta.get("fetched_at", 0) < self.ttl
+
+    def validators(self, meta):
+        """Conditional request headers for a cached entry."""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def read_body(self, url):
+        """Return cached body bytes (and mark the entry as recently used)."""
+        _, body_path = self._paths(url)
+        with open(body_path, "rb") as f:
+            body = f.read()
+        try:
+            os.utime(body_path, None)
+        except OSError:
+            pass
+        return body
+
+    def put(self, url, body, headers):
+        """Store a 200 response body with its validators, then enforce the size budget."""
+        os.makedirs(self.root, exist_ok=True)
+        meta_path, body_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag") or "",
+            "last_modified": headers.get("Last-Modified") or "",
+            "fetched_at": time.time(),
+            "size": len(body),
+        }
+        with self._lock, self._file_lock:
+            write_atomic(body_path, body)
+            write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+            self._evict()
+
+    def revalidated(self, url, meta, headers):
+        """Server answered 304: the body is still good, restart its freshness window."""
+        meta = dict(meta)
+        meta["fetched_at"] = time.time()
+        if headers is not None:
+            meta["etag"] = headers.get("ETag") or meta.get("etag", "")
+            meta["last_modified"] = headers.get("Last-Modified") or meta.get("last_modified", "")
+        meta_path, _ = self._paths(url)
+        try:
+            write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+        except OSError:
+            pass
+
+    def delete(self, url):
+        for path in self._paths(url):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self):
+        """Drop expired entries, then least-recently-used bodies until under max_bytes."""
+        with self._lock, self._file_lock:
+            self._evict()
+
+    def _evict(self):
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        now = time.time()
+        entries = []
+        total = 0
+        for name in names:
+            if not name.endswith(".body"):
+                continue
+            body_path = os.path.join(self.root, name)
+            meta_path = body_path[:-5] + ".json"
+            try:
+                st = os.stat(body_path)
+            except OSError:
+                continue
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    fetched_at = json.load(f).get("fetched_at", 0)
+            except (OSError, ValueError):
+                fetched_at = st.st_mtime     # no (readable) meta: age by the body itself
+            if now - fetched_at > self.max_age:
+                _remove_quietly(body_path, meta_path)
+                continue
+            entries.append((st.st_mtime, st.st_size, body_path, meta_path))
+            total += st.st_size
+        entries.sort()
+        for _, size, body_path, meta_path in entries:
+            if total <= self.max_bytes:
+                break
+            _remove_quietly(body_path, meta_path)
+            total -= size
+
+
+def _remove_quietly(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class PooledResponse:
+    """
+    Response from HTTPSession.request. Read it (fully or in chunks) and close it;
+    the connection goes back to the pool only when the body was read to the end.
+    """
+
+    def __init__(self, session, key, conn, resp, url):
+        self._session = session
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+
+    def read(self, amt=None):
+        return self._resp.read(amt)
+
+    def close(self):
+        if self._conn is None:
+            return
+        if self._resp.isclosed() and not self._resp.will_close:
+            self._session._release(self._key, self._conn)
+        else:
+            self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _proxy_auth(proxy):
+    """Proxy-Authorization header for credentials in a proxy URL ({} without any)."""
+    parts = urllib.parse.urlsplit(proxy)
+    if parts.username is None:
+        return {}
+    user = urllib.parse.unquote(parts.username)
+    password = urllib.parse.unquote(parts.password or "")
+    token = base64.b64encode(("%s:%s" % (user, password)).encode("utf-8")).decode("ascii")
+    return {"Proxy-Authorization": "Basic " + token}
+
+
+class HTTPSession:
+    """
+    Keep-alive HTTP/1.1 client that reuses one connection pool per (scheme, host, port, proxy).
+    Mirrors urlopen: follows redirects, honours the same proxy settings (urllib.request.getproxies:
+    *_proxy variables, or the Windows Internet settings; https goes through a CONNECT tunnel)
+    and raises urllib.error.HTTPError for non-2xx (including 304), so callers keep their
+    existing error handling.
+    A connection serves one request at a time: requests that overlap (the planner prefetch
+    while the guide is still streaming) each get their own, and both are pooled afterwards.
+    stats: requests, new_connections, reuses, stale_retries.
+    """
+
+    def __init__(self, max_idle_per_host=POOL_MAX_IDLE_PER_HOST):
+        self.max_idle_per_host = max_idle_per_host
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._proxies = None    # urllib.request.getproxies(), read on first use
+        self._bypass = {}       # host -> proxy_bypass(host)
+        self.stats = {"requests": 0, "new_connections": 0, "reuses": 0, "stale_retries": 0}
+
+    def _proxy(self, scheme, host):
+        """Proxy URL for a request (None to connect directly), as urlopen would pick it."""
+        if self._proxies is None:
+            self._proxies = urllib.request.getproxies()
+        proxy = self._proxies.get(scheme)
+        if not proxy:
+            return None
+        if host not in self._bypass:
+            self._bypass[host] = bool(urllib.request.proxy_bypass(host))
+        if self._bypass[host]:
+            return None
+        return proxy if "://" in proxy else "http://" + proxy
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _acquire(self, key, timeout, fresh=False):
+        conn = None
+        if not fresh:
+            with self._lock:
+                idle = self._idle.get(key)
+                conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            self._count("reuses")
+            return conn, True
+        scheme, host, port, proxy = key
+        if proxy:
+            parts = urllib.parse.urlsplit(proxy)
+            proxy_port = parts.port or (443 if parts.scheme == "https" else 80)
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(parts.hostname, proxy_port, timeout=timeout)
+                conn.set_tunnel(host, port, headers=_proxy_auth(proxy))
+            else:
+                conn = http.client.HTTPConnection(parts.hostname, proxy_port, timeout=timeout)
+        elif scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        self._count("new_connections")
+        return conn, False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, key, method, target, headers, timeout):
+        fresh = False
+        while True:
+            conn, reused = self._acquire(key, timeout, fresh=fresh)
+            try:
+                conn.request(method, target, headers=headers)
+                return conn, conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+            except Exception:
+                conn.close()
+                raise
+            # The idle connection had been dropped by the server: retry once on a new one
+            self._count("stale_retries")
+            fresh = True
+
+    def request(self, url, headers=None, timeout=15, method="GET", max_redirects=5):
+        """Send a request and return an open PooledResponse (2xx only)."""
+        headers = dict(headers or {})
+        for _ in range(max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in ("http", "https") or not parts.hostname:
+                raise urllib.error.URLError("unsupported URL: %s" % url)
+            port = parts.port or (443 if scheme == "https" else 80)
+            proxy = self._proxy(scheme, parts.hostname)
+            key = (scheme, parts.hostname, port, proxy)
+            target = parts.path or "/"
+            if parts.query:
+                target += "?" + parts.query
+            send_headers = headers
+            if proxy and scheme == "http":
+                # Plain HTTP through a proxy: absolute URL as the target, credentials per request
+                target = urllib.parse.urlunsplit((scheme, parts.netloc, parts.path or "/", parts.query, ""))
+                send_headers = dict(headers, **_proxy_auth(proxy))
+            self._count("requests")
+            try:
+                conn, resp = self._send(key, method, target, send_headers, timeout)
+            except OSError as e:
+                raise urllib.error.URLError(e)
+            pooled = PooledResponse(self, key, conn, resp, url)
+            if 200 <= resp.status < 300:
+                return pooled
+            body = resp.read()
+            pooled.close()
+            location = resp.headers.get("Location")
+            if resp.status in REDIRECT_CODES and location:
+                url = urllib.parse.urljoin(url, location)
+                continue
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+        raise urllib.error.URLError("too many redirects")
+
+    def close(self):
+        """Close every idle pooled connection."""
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for conn in idle:
+                conn.close()
+
+
+_session = HTTPSession()
+
+
+def get_session():
+    """Process-wide pooled HTTPSession shared by every fetch."""
+    return _session
+
+
+def pool_stats():
+    """Snapshot of connection pool counters (requests, new_connections, reuses, stale_retries)."""
+    with _session._lock:
+        return dict(_session.stats)
+
+
+_http_cache = None
+
+
+def get_http_cache():
+    """Process-wide HTTPCache instance (created on first use)."""
+    global _http_cache
+    if _http_cache is None:
+        _http_cache = HTTPCache()
+    return _http_cache
+
+
+class ResponseTooLarge(Exception):
+    """Raised when a response body exceeds the fetch max_bytes limit."""
+
+
+def _decode_stream(byte_chunks):
+    """Incrementally decode UTF-8 byte chunks (errors replaced), yielding str chunks."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _iter_bytes(body, chunk_size):
+    for i in range(0, len(body), chunk_size):
+        yield body[i:i + chunk_size]
+
+
+class ContentDecoder:
+    """
+    Streaming Content-Encoding decoder (gzip, deflate, br). zlib output is produced in
+    steps of at most chunk_size bytes, so a highly compressed body cannot balloon in
+    memory before the max_bytes check sees it.
+    """
+
+    def __init__(self, encoding, chunk_size=FETCH_CHUNK_SIZE):
+        encoding = (encoding or "").strip().lower()
+        self.chunk_size = chunk_size
+        self._brotli = None
+        self._zlib = None
+        self._raw_deflate_fallback = False
+        if encoding in ("gzip", "x-gzip"):
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            # Some servers send raw deflate instead of the zlib-wrapped stream the spec asks for
+            self._zlib = zlib.decompressobj()
+            self._raw_deflate_fallback = True
+        elif encoding == "br" and brotli is not None:
+            self._brotli = brotli.Decompressor()
+        elif encoding not in ("", "identity"):
+            raise urllib.error.URLError("unsupported Content-Encoding: %s" % encoding)
+
+    def decode(self, data):
+        """Yield decoded byte chunks for one chunk of the encoded body."""
+        if self._brotli is not None:
+            process = getattr(self._brotli, "process", None) or self._brotli.decompress
+            out = process(data)
+            if out:
+                yield out
+            return
+        if self._zlib is None:
+            if data:
+                yield data
+            return
+        while data:
+            try:
+                out = self._zlib.decompress(data, self.chunk_size)
+            except zlib.error:
+                if not self._raw_deflate_fallback:
+                    raise
+                self._zlib = zlib.decompressobj(-zlib.MAX_WBITS)
+                self._raw_deflate_fallback = False
+                continue
+            self._raw_deflate_fallback = False
+            if out:
+                yield out
+            data = self._zlib.unconsumed_tail
+
+    def flush(self):
+        if self._zlib is not None:
+            return self._zlib.flush()
+        return b""
+
+
+def _iter_response(url, resp, cache, max_bytes, chunk_size, hasher=None):
+    """
+    Read resp in chunks, undo Content-Encoding and enforce max_bytes on the decoded size;
+    stores the decoded body in cache (and the snapshot archive) once fully read.
+    hasher (hashlib) sees every decoded byte.
+    """
+    length = resp.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise ResponseTooLarge("Response larger than %d bytes" % max_bytes)
+    decoder = ContentDecoder(resp.headers.get("Content-Encoding"), chunk_size)
+    raw = [] if cache else None
+    total = 0
+    while True:
+        data = resp.read(chunk_size)
+        decoded = decoder.decode(data) if data else iter((decoder.flush(),))
+        for chunk in decoded:
+            if not chunk:
+                continue
+            total += len(chunk)
+            if total > max_bytes:
+                raise ResponseTooLarge("Response larger than %d bytes" % max_bytes)
+            if raw is not None:
+                raw.append(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            yield chunk
+        if not data:
+            break
+    if cache:
+        body = b"".join(raw)
+        try:
+            cache.put(url, body, resp.headers)
+        except OSError:
+            pass
+        _archive_body(url, body, hasher.hexdigest() if hasher is not None else None)
+
+
+class URLStream:
+    """
+    One fetch as an iterable of decoded str chunks.
+    Raises ResponseTooLarge past max_bytes. Closing the stream early stops reading
+    (the connection is then dropped instead of pooled, and nothing is cached).
+    With use_cache, a fresh cached copy is returned without any request; a stale one is
+    re-validated with If-None-Match/If-Modified-Since and served from disk on 304.
+    digest is the sha256 hex of the body bytes: known as soon as the stream is opened when
+    the body comes from the disk cache, otherwise once it has been read to the end.
+    """
+
+    def __init__(self, url, timeout=15, use_cache=True, max_bytes=FETCH_MAX_BYTES, chunk_size=FETCH_CHUNK_SIZE):
+        self.url = url
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.digest = None
+        self.from_cache = False
+        self.bytes_read = 0     # body bytes (after Content-Encoding) handed out so far
+        self.body_size = None   # full body size, once known
+        self._body = None
+        self._resp = None
+        self._cache = cache = get_http_cache() if use_cache else None
+        meta = cache.get(url) if cache else None
+        if meta and cache.is_fresh(meta):
+            try:
+                self._body = cache.read_body(url)
+            except OSError:
+                meta = None
+
+        if self._body is None:
+            headers = {"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING}
+            if meta:
+                headers.update(cache.validators(meta))
+            try:
+                self._resp = get_session().request(url, headers=headers, timeout=timeout)
+            except urllib.error.HTTPError as e:
+                if e.code != 304 or not meta:
+                    raise
+                self._body = cache.read_body(url)
+                cache.revalidated(url, meta, e.headers)
+
+        if self._body is not None:
+            self.from_cache = True
+            self.body_size = len(self._body)
+            self.digest = hashlib.sha256(self._body).hexdigest()
+            if use_cache:
+                _archive_body(url, self._body, self.digest)
+
+    def __iter__(self):
+        if self._body is not None:
+            yield from _decode_stream(self._counted(_iter_bytes(self._body, self.chunk_size)))
+            return
+        hasher = hashlib.sha256()
+        with self._resp:
+            yield from _decode_stream(self._counted(
+                _iter_response(self.url, self._resp, self._cache, self.max_bytes, self.chunk_size, hasher)
+            ))
+        self.digest = hasher.hexdigest()
+        self.body_size = self.bytes_read
+
+    def _counted(self, byte_chunks):
+        for chunk in byte_chunks:
+            self.bytes_read += len(chunk)
+            yield chunk
+
+    def close(self):
+        if self._resp is not None:
+            self._resp.close()
+
+
+def iter_url_chunks(url, timeout=15, use_cache=True, max_bytes=FETCH_MAX_BYTES, chunk_size=FETCH_CHUNK_SIZE):
+    """Stream URL as decoded str chunks (see URLStream)."""
+    stream = URLStream(url, timeout, use_cache, max_bytes, chunk_size)
+    try:
+        yield from stream
+    finally:
+        stream.close()
+
+
+class ParseMemo:
+    """
+    Memo of extractor output keyed by (kind, url, body sha256, EXTRACTOR_VERSION): a bounded
+    in-memory LRU in front of one JSON file per entry under root (newest max_disk kept).
+    Bumping EXTRACTOR_VERSION changes every key, so old entries are never hit and age out.
+    Values are stored as JSON text and every get returns a fresh copy.
+    """
+
+    def __init__(self, root=MEMO_DIR, max_memory=MEMO_MAX_MEMORY, max_disk=MEMO_MAX_DISK):
+        self.root = root
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind, url, digest):
+        raw = "%s\0%s\0%s\0%s" % (EXTRACTOR_VERSION, kind, url, digest)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+        if text is None:
+            path = os.path.join(self.root, key + ".json")
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                os.utime(path, None)
+            except OSError:
+                return None
+            self._remember(key, text)
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    def put(self, key, value):
+        text = json.dumps(value)
+        self._remember(key, text)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            write_atomic(os.path.join(self.root, key + ".json"), text.encode("utf-8"))
+            self._evict_disk()
+        except OSError:
+            pass
+
+    def _remember(self, key, text):
+        with self._lock:
+            self._memory[key] = text
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".json"):
+                path = os.path.join(self.root, name)
+                try:
+                    entries.append((os.stat(path).st_mtime, path))
+                except OSError:
+                    pass
+        if len(entries) <= self.max_disk:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_disk]:
+            _remove_quietly(path)
+
+
+_parse_memo = None
+
+
+def get_parse_memo():
+    """Process-wide ParseMemo instance (created on first use)."""
+    global _parse_memo
+    if _parse_memo is None:
+        _parse_memo = ParseMemo()
+    return _parse_memo
+
+
+class SnapshotArchive:
+    """
+    Append-only archive of every fetched page body, for re-running extractors offline.
+    snapshots.dat holds the zlib-compressed bodies back to back; snapshots.idx has one JSON
+    line per body (url, fetched_at, offset, length, size, sha256). A body identical to the
+    url's latest snapshot is not stored again. Reads go through an mmap of snapshots.dat.
+    Once snapshots.dat outgrows max_bytes it is compacted to each url's newest keep_per_url
+    snapshots. Appends, reads and compactions hold snapshots.lock, so several processes can
+    share one archive; an index rewritten by another process is re-read on next use.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR, max_bytes=ARCHIVE_MAX_BYTES, keep_per_url=ARCHIVE_KEEP_PER_URL):
+        self.root = root
+        self.data_path = os.path.join(root, "snapshots.dat")
+        self.index_path = os.path.join(root, "snapshots.idx")
+        self.max_bytes = max_bytes
+        self.keep_per_url = keep_per_url
+        self._latest = None     # url -> newest index entry, loaded on first use
+        self._index_stat = None # (size, mtime_ns, ino) of snapshots.idx when _latest was built
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(root, "snapshots.lock"))
+
+    def entries(self):
+        """Every complete index entry, oldest first (torn trailing writes are skipped)."""
+        try:
+            data_size = os.path.getsize(self.data_path)
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and entry.get("offset", data_size) + entry.get("length", 0) <= data_size:
+                entries.append(entry)
+        return entries
+
+    def _stat_index(self):
+        try:
+            st = os.stat(self.index_path)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def _latest_entries(self):
+        stat = self._stat_index()
+        if self._latest is None or stat != self._index_stat:
+            self._latest = {e["url"]: e for e in self.entries()}
+            self._index_stat = stat
+        return self._latest
+
+    def latest(self, url):
+        """Newest index entry for url, or None."""
+        with self._lock, self._file_lock:
+            return self._latest_entries().get(url)
+
+    def urls(self):
+        with self._lock, self._file_lock:
+            return list(self._latest_entries())
+
+    def append(self, url, body, digest=None):
+        """Store body (bytes) for url unless it matches the newest snapshot; returns the entry."""
+        digest = digest or hashlib.sha256(body).hexdigest()
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, self._file_lock:
+            latest = self._latest_entries().get(url)
+            if latest and latest.get("sha256") == digest:
+                return latest
+            blob = zlib.compress(body, ARCHIVE_COMPRESS_LEVEL)
+            with open(self.data_path, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            entry = {
+                "url": url, "fetched_at": time.time(), "offset": offset, "length": len(blob),
+                "size": len(body), "sha256": digest,
+            }
+            # The index line goes last, so a crash never leaves it pointing at a partial blob
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._latest[url] = entry
+            self._index_stat = self._stat_index()
+            if offset + len(blob) > self.max_bytes:
+                try:
+                    self._compact()
+                except OSError:
+                    pass    # e.g. the file is open elsewhere on Windows; retried on the next append
+            return entry
+
+    def compact(self):
+        """Drop all but each url's newest keep_per_url snapshots; returns the bytes freed."""
+        with self._lock, self._file_lock:
+            return self._compact()
+
+    def _compact(self):
+        entries = self.entries()
+        if not entries:
+            return 0
+        keep = self.keep_per_url
+        while True:
+            seen = collections.Counter()
+            kept = []
+            for entry in reversed(entries):
+                seen[entry["url"]] += 1
+                if seen[entry["url"]] <= keep:
+                    kept.append(entry)
+            kept.reverse()
+            if keep <= 1 or sum(e["length"] for e in kept) <= self.max_bytes:
+                break
+            keep -= 1
+        old_size = os.path.getsize(self.data_path)
+        fd, data_tmp = tempfile.mkstemp(dir=self.root, suffix=".dat.tmp")
+        index_tmp = None
+        index_lines = []
+        try:
+            with os.fdopen(fd, "wb") as out, open(self.data_path, "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for entry in kept:
+                    start = entry["offset"]
+                    index_lines.append(json.dumps(dict(entry, offset=out.tell())) + "\n")
+                    out.write(view[start:start + entry["length"]])
+                out.flush()
+                os.fsync(out.fileno())
+            fd, index_tmp = tempfile.mkstemp(dir=self.root, suffix=".idx.tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as out:
+                out.writelines(index_lines)
+                out.flush()
+                os.fsync(out.fileno())
+            # Data first: until the index is replaced too, old entries fail their sha256 check
+            os.replace(data_tmp, self.data_path)
+            os.replace(index_tmp, self.index_path)
+        finally:
+            _remove_quietly(data_tmp, *([index_tmp] if index_tmp else []))
+        self._latest = None
+        return old_size - os.path.getsize(self.data_path)
+
+    @contextlib.contextmanager
+    def reader(self):
+        """Yields read(entry) -> body bytes, backed by one mmap for the whole block."""
+        with open(self.data_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                def read(entry):
+                    raise KeyError(entry.get("url"))
+                yield read
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                def read(entry):
+                    start = entry["offset"]
+                    return zlib.decompress(view[start:start + entry["length"]])
+                yield read
+
+    def read_latest(self, url):
+        """Newest archived body for url as str, or None."""
+        with self._lock, self._file_lock:
+            entry = self._latest_entries().get(url)
+            if entry is None:
+                return None
+            try:
+                with self.reader() as read:
+                    body = read(entry)
+            except (OSError, KeyError, zlib.error):
+                return None
+        if entry.get("sha256") and hashlib.sha256(body).hexdigest() != entry["sha256"]:
+            return None
+        return body.decode("utf-8", errors="replace")
+
+
+_snapshot_archive = None
+
+
+def get_snapshot_archive():
+    """Process-wide SnapshotArchive (None when ARCHIVE_ENABLED is off)."""
+    global _snapshot_archive
+    if _snapshot_archive is None and ARCHIVE_ENABLED:
+        _snapshot_archive = SnapshotArchive()
+    return _snapshot_archive
+
+
+def _archive_body(url, body, digest=None):
+    archive = get_snapshot_archive()
+    if archive is None:
+        return
+    try:
+        archive.append(url, body, digest)
+    except OSError:
+        pass
+
+
+def fetch_url(url, timeout=15, use_cache=True, max_bytes=FETCH_MAX_BYTES):
+    """Fetch URL and return decoded HTML string (see iter_url_chunks)."""
+    return "".join(iter_url_chunks(url, timeout, use_cache, max_bytes))
+
+
+# Tokens of GuidePageParser: a start/end tag (groups: "/", name, attribute text), or a
+# comment/doctype/processing instruction, which is dropped without text
+TAG_RE = re.compile(r"<(?:(/?)([a-zA-Z][^\s/>]*)([^>]*)>|!--.*?-->|!(?!--)[^>]*>|\?[^>]*>)", re.DOTALL)
+TAG_ATTR_RE = re.compile(r"""([^\s/>=][^\s/>=]*)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]*))?""")
+RAW_TEXT_END_RE = {
+    "script": re.compile(r"</script[^>]*>", re.IGNORECASE),
+    "style": re.compile(r"</style[^>]*>", re.IGNORECASE),
+}
+RAW_TEXT_END_MAX = 64   # chars kept back at a chunk edge that may be the start of such an end tag
+# Where the tag-by-tag path is needed; everything before such a point is stripped in bulk
+# (and, until the sr-planner ID is found, anything mentioning "planner")
+TOKEN_STOP_RE = re.compile(r"<(?i:script|style|/?title|!--)")
+PLAIN_TAG_RE = re.compile(r"</?[a-zA-Z][^>]*>|<!(?!--)[^>]*>|<\?[^>]*>")
+
+
+def _tag_attrs(s):
+    """Attribute text of a start tag -> [(name, value)] like HTMLParser (values unescaped)."""
+    attrs = []
+    for m in TAG_ATTR_RE.finditer(s):
+        value = m.group(2)
+        if value is not None:
+            if value[:1] in ("'", '"'):
+                value = value[1:-1]
+            value = unescape(value)
+        attrs.append((m.group(1).lower(), value))
+    return attrs
+
+
+class GuidePageParser:
+    """
+    Single-pass tokenizer for a guide page. Feed it the HTML (whole or in chunks), then close();
+    afterwards it holds:
+    - text: visible text (no script/style), whitespace collapsed, entities decoded
+    - title: <title> text
+    - planner_id: planner build ID (sr-planner data-sr-id, else first /planner/{id} link)
+    - scripts: list of (attrs dict, body) for every <script>
+    Runs of ordinary tags and text are stripped in bulk with PLAIN_TAG_RE; only script,
+    style, title, comments and anything mentioning "planner" go tag by tag, and script/style
+    bodies are skipped with one search each. The cost stays close to a few regex passes.
+    """
+
+    def __init__(self):
+        self.title = ""
+        self.scripts = []
+        self._buf = ""              # unprocessed tail of what was fed (an unfinished tag)
+        self._text_parts = []       # raw text runs and " " for tags since the last flush
+        self._text_blocks = []      # whitespace-collapsed, unescaped runs of _text_parts
+        self._text_space = False    # last flushed run ended in whitespace
+        self._title_parts = None    # list while inside the first <title>
+        self._sr_id = None
+        self._planner_link = None
+        self._skip = None           # "script" / "style" while inside one
+        self._script_attrs = None
+        self._script_parts = []
+        self.text = ""
+        self.stopped_early = False
+
+    @property
+    def planner_id(self):
+        return self._sr_id or self._planner_link
+
+    def _find_planner_link(self, s):
+        if self._planner_link is None and "/planner/" in s:
+            m = PLANNER_LINK_RE.search(s)
+            if m:
+                self._planner_link = m.group(1)
+
+    def feed(self, data):
+        self._buf += data
+        self._goahead(False)
+
+    def _goahead(self, end):
+        buf = self._buf
+        pos = 0
+        n = len(buf)
+        while pos < n:
+            if self._skip:
+                m = RAW_TEXT_END_RE[self._skip].search(buf, pos)
+                if m is None:
+                    keep = n if end else buf.find("<", max(pos, n - RAW_TEXT_END_MAX))
+                    if keep < 0:
+                        keep = n
+                    if self._skip == "script":
+                        self._script_parts.append(buf[pos:keep])
+                    pos = keep
+                    break
+                if self._skip == "script":
+                    self._script_parts.append(buf[pos:m.start()])
+                self._end_raw_text()
+                pos = m.end()
+                continue
+            if self._title_parts is None:
+                m = TOKEN_STOP_RE.search(buf, pos)
+                if m is not None:
+                    stop = m.start()
+                else:
+                    stop = n if end else buf.rfind("<", pos)
+                if self._sr_id is None:
+                    k = buf.find("planner", pos, m.start() if m is not None else n)
+                    if k >= 0:
+                        stop = buf.rfind("<", pos, k)
+                if stop > pos:
+                    self._text_parts.append(PLAIN_TAG_RE.sub(" ", buf[pos:stop]))
+                    self._flush_text()
+                    pos = stop
+                    if pos == n:
+                        break
+            i = buf.find("<", pos)
+            if i < 0:
+                cut = n if end else buf.rfind("&", max(pos, n - 32))
+                if cut < 0 or ";" in buf[cut:]:
+                    cut = n     # no entity cut in half at the chunk edge
+                self._handle_text(buf[pos:cut])
+                pos = cut
+                break
+            if i > pos:
+                self._handle_text(buf[pos:i])
+            m = TAG_RE.match(buf, i)
+            if m is None:
+                if not end and (buf.find(">", i) < 0 or buf.startswith("<!--", i)):
+                    pos = i     # unfinished tag or comment: wait for the next chunk
+                    break
+                self._handle_text("<")
+                pos = i + 1
+                continue
+            pos = m.end()
+            name = m.group(2)
+            if name is None:
+                continue
+            name = name.lower()
+            if m.group(1):
+                self._handle_endtag(name)
+            else:
+                self._handle_starttag(name, m.group(3))
+        self._buf = buf[pos:]
+
+    def _handle_text(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        self._text_parts.append(data)
+        self._find_planner_link(data)
+
+    def _handle_starttag(self, tag, rest):
+        self._text_parts.append(" ")
+        if len(self._text_parts) > 4096:
+            self._flush_text()
+        if tag == "title":
+            if not self.title and self._title_parts is None:
+                self._title_parts = []
+        elif tag in ("script", "style"):
+            self._skip = tag
+            if tag == "script":
+                self._script_attrs = dict(_tag_attrs(rest))
+                self._script_parts = []
+            if rest.endswith("/"):
+                self._end_raw_text()
+        if (self._sr_id is None or self._planner_link is None) and "planner" in rest:
+            sr_id = None
+            is_planner = False
+            for name, value in _tag_attrs(rest):
+                if not value:
+                    continue
+                if name == "data-sr-id":
+                    sr_id = value
+                elif "sr-planner" in value:
+                    is_planner = True
+                self._find_planner_link(value)
+            if is_planner and self._sr_id is None and sr_id and PLANNER_ID_RE.fullmatch(sr_id):
+                self._sr_id = sr_id
+
+    def _handle_endtag(self, tag):
+        if tag == "title" and self._title_parts is not None:
+            self.title = unescape("".join(self._title_parts))
+            self._title_parts = None
+        self._text_parts.append(" ")
+
+    def _end_raw_text(self):
+        if self._skip == "script":
+            body = "".join(self._script_parts)
+            self.scripts.append((self._script_attrs or {}, body))
+            self._find_planner_link(body)
+            self._script_parts = []
+        self._skip = None
+        self._text_parts.append(" ")
+
+    def _flush_text(self):
+        """Collapse buffered text into a block, keeping one space at block boundaries."""
+        raw = "".join(self._text_parts)
+        self._text_parts = []
+        if "&" in raw:
+            raw = unescape(raw)
+        words = raw.split()
+        if not words:
+            if raw:
+                self._text_space = True
+            return
+        if self._text_blocks and (self._text_space or raw[0].isspace()):
+            self._text_blocks.append(" ")
+        self._text_blocks.append(" ".join(words))
+        self._text_space = raw[-1].isspace()
+
+    def text_so_far(self):
+        """Collapsed visible text fed so far (before close)."""
+        self._flush_text()
+        return "".join(self._text_blocks)
+
+    def close(self):
+        self._goahead(True)
+        self._skip = None           # an unterminated script (truncated page) is dropped
+        if self._title_parts is not None:
+            self.title = unescape("".join(self._title_parts))
+            self._title_parts = None
+        self._flush_text()
+        self.text = "".join(self._text_blocks)
+        self._text_blocks = []
+
+
+def tokenize_guide(html, chunk_size=PARSE_CHUNK_SIZE):
+    """
+    Run GuidePageParser over html (a str, or any iterable of str chunks) and return it closed.
+    A str is fed in chunk_size slices so the parser's buffer never holds a full copy of the page.
+    """
+    parser = GuidePageParser()
+    if isinstance(html, str):
+        chunks = (html[i:i + chunk_size] for i in range(0, len(html), chunk_size))
     else:
-        # List items may be stripped to "Intellect Luck Versatility Crit" before "Legendary"
-        attrs_inline = re.search(
-            r"(Intellect)\s+(Luck)\s+(Versatility)\s+(Crit)\s*(?=Legendary|$)",
-            text,
-            re.IGNORECASE,
-        )
-        if attrs_inline:
-            gearing_parts.append("Attributes: 1. %s  2. %s  3. %s  4. %s" % attrs_inline.groups())
+        chunks = html
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser
+
+
+class SectionRule:
+    """
+    One extraction rule: when `anchor` (a keyword) is seen, `pattern` must match starting
+    right there within `window` chars. `requires` lists keywords the pattern cannot match
+    without (checked with a cached next-occurrence lookup before running the pattern).
+    Rules for the same field are listed in priority order. open_end rules may be cut off
+    by the window (their value runs to end of text); any other match reaching the window
+    edge is rejected.
+    """
+
+    __slots__ = ("field", "anchor", "pattern", "window", "template", "requires", "open_end")
+
+    def __init__(self, field, anchor, pattern, window, template, requires=(), open_end=False):
+        self.field = field
+        self.anchor = anchor
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.window = window
+        self.template = template
+        self.requires = tuple(re.compile(re.escape(k), re.IGNORECASE) for k in requires)
+        self.open_end = open_end
+
+    def match(self, text, pos):
+        end = min(len(text), pos + self.window)
+        m = self.pattern.match(text, pos, end)
+        if m is None or (not self.open_end and m.end() == end < len(text)):
+            return None
+        return self.template % tuple(g.strip() for g in m.groups())
 
+
+SECTION_RULES = (
+    # Attributes: "1. Intellect 2. Luck ..." or after stripping tags "Intellect Luck Versatility Crit"
+    SectionRule("attributes", "1.",
+                r"1\.\s*(\w+)\s+2\.\s*(\w+)\s+3\.\s*(\w+)\s+4\.\s*(\w+)(?=\s|\.|Legendary|$)",
+                200, "Attributes: 1. %s  2. %s  3. %s  4. %s", requires=("4.",)),
+    SectionRule("attributes", "intellect",
+                r"(Intellect)\s+(Luck)\s+(Versatility)\s+(Crit)\s*(?=Legendary|$)",
+                120, "Attributes: 1. %s  2. %s  3. %s  4. %s", requires=("crit",)),
     # Legendary Affix: "For legendary affixes, focus on ..."
-    leg_m = re.search(
-        r"For legendary affixes, focus on\s+([^.]+?)(?=\.|Celestial|$)",
-        text,
-        re.IGNORECASE,
-    )
-    if leg_m:
-        gearing_parts.append("Legendary affix: " + leg_m.group(1).strip())
+    SectionRule("legendary_affix", "for legendary affixes",
+                r"For legendary affixes, focus on\s+([^.]+?)(?=\.|Celestial|$)",
+                300, "Legendary affix: %s"),
     # Legendary priority: "1. Cast Speed 2. MATK 3. Intellect" or "Cast Speed , then MATK , and Intellect"
-    leg_list = re.search(
-        r"1\.\s*(Cast Speed|MATK|Intellect|Ranged Damage|Attack SPD)\s+2\.\s*([^.]+?)\s+3\.\s*(\w+)(?=\s|\.|Celestial|$)",
-        text,
-        re.IGNORECASE,
-    )
-    if leg_list:
-        gearing_parts.append("Legendary priority: 1. %s  2. %s  3. %s" % (
-            leg_list.group(1).strip(), leg_list.group(2).strip(), leg_list.group(3).strip()
-        ))
-    else:
-        # From "focus on Cast Speed , then MATK , and Intellect" we already have the line; add explicit priority
-        leg_any = re.search(r"focus on\s+([^,]+),\s*then\s+([^,]+),\s*and\s+(\w+)\s+as the last", text, re.IGNORECASE)
-        if leg_any:
-            gearing_parts.append("Legendary priority: 1. %s  2. %s  3. %s" % (
-                leg_any.group(1).strip(), leg_any.group(2).strip(), leg_any.group(3).strip()
-            ))
+    SectionRule("legendary_priority", "1.",
+                r"1\.\s*(Cast Speed|MATK|Intellect|Ranged Damage|Attack SPD)\s+2\.\s*([^.]+?)\s+3\.\s*(\w+)(?=\s|\.|Celestial|$)",
+                200, "Legendary priority: 1. %s  2. %s  3. %s", requires=("3.",)),
+    SectionRule("legendary_priority", "focus on",
+                r"focus on\s+([^,]+),\s*then\s+([^,]+),\s*and\s+(\w+)\s+as the last",
+                300, "Legendary priority: 1. %s  2. %s  3. %s", requires=("as the last",)),
+    # Food and Serum
+    SectionRule("food", "food", r"Food\s*:\s*(.+?)\s*Serum\s*:", 300, "%s", requires=("serum",)),
+    SectionRule("serum", "serum",
+                r"Serum\s*:\s*(.+?)(?=\s*To learn|\s*Life Skills|\s*Culinary|$)",
+                200, "%s", open_end=True),
+)
+GEARING_FIELDS = ("attributes", "legendary_affix", "legendary_priority")
+_SECTION_RULE_PRIORITY = {
+    rule: sum(1 for r in SECTION_RULES[:i] if r.field == rule.field) for i, rule in enumerate(SECTION_RULES)
+}
 
-    gearing = "\n".join(gearing_parts) if gearing_parts else ""
 
-    # Food and Serum
-    food_m = re.search(r"Food\s*:\s*(.+?)\s*Serum\s*:", text, re.IGNORECASE)
-    if food_m:
-        food = food_m.group(1).strip()
-    serum_m = re.search(r"Serum\s*:\s*(.+?)(?=\s*To learn|\s*Life Skills|\s*Culinary|$)", text, re.IGNORECASE)
-    if serum_m:
-        serum = serum_m.group(1).strip()
+def _anchor_scanner(rules):
+    """One case-insensitive alternation over the anchors of rules (longest first)."""
+    anchors = sorted({r.anchor for r in rules}, key=len, reverse=True)
+    if not anchors:
+        return None
+    # A first-character class in front lets the regex engine skip non-candidate positions quickly
+    first = "".join(sorted({a[0] for a in anchors}))
+    return re.compile("(?=[%s])(?:%s)" % (re.escape(first), "|".join(re.escape(a) for a in anchors)), re.IGNORECASE)
+
 
-    return {"gearing": gearing, "food": food, "serum": serum}
+def extract_section_fields(text):
+    """
+    Run SECTION_RULES over text with a single left-to-right anchor scan. Each pattern only
+    runs inside a bounded window after its anchor, required keywords are located with
+    next-occurrence pointers that only move forward, and rules are dropped from the scan
+    once they are satisfied or can no longer match, so the whole pass is linear in len(text).
+    Returns {field: value} for every field found (first match of the highest-priority rule).
+    """
+    found = {}
+    live = list(SECTION_RULES)
+    next_hit = {}           # required keyword pattern -> start of next occurrence, -1 for none
+    scan = _anchor_scanner(live)
+    pos = 0
+    while scan is not None:
+        m = scan.search(text, pos)
+        if m is None:
+            break
+        start = m.start()
+        pos = m.end()
+        anchor = m.group(0).lower()
+        dropped = []
+        for rule in live:
+            if rule.anchor != anchor:
+                continue
+            usable = True
+            for kw in rule.requires:
+                hit = next_hit.get(kw, 0)
+                if hit != -1 and hit <= start:
+                    km = kw.search(text, start + 1)
+                    hit = next_hit[kw] = km.start() if km else -1
+                if hit == -1:
+                    dropped.append(rule)
+                if hit == -1 or hit >= start + rule.window:
+                    usable = False
+                    break
+            if not usable:
+                continue
+            value = rule.match(text, start)
+            if value is None:
+                continue
+            prio = _SECTION_RULE_PRIORITY[rule]
+            found[rule.field] = value
+            dropped.extend(r for r in live if r.field == rule.field and _SECTION_RULE_PRIORITY[r] >= prio)
+        if dropped:
+            live = [r for r in live if r not in dropped]
+            scan = _anchor_scanner(live)
+    return found
+
+
+def extract_sections_from_text(full_text):
+    """
+    Extract only:
+    - Attributes priority list (1. Intellect 2. Luck ...)
+    - Legendary Affix list (1. Cast Speed 2. MATK 3. Intellect)
+    - Food and Serum.
+    No long gearing paragraphs (Embeds, Modules, Emblem, Set).
+    """
+    text = full_text.replace("\r\n", "\n").replace("\r", "\n")
+    fields = extract_section_fields(text)
+    gearing_parts = [fields[f] for f in GEARING_FIELDS if f in fields]
+    return {
+        "gearing": "\n".join(gearing_parts),
+        "food": fields.get("food", ""),
+        "serum": fields.get("serum", ""),
+    }
 
 
 def extract_planner_build_id(guide_html):
@@ -112,67 +1315,348 @@ def extract_planner_build_id(guide_html):
     return None
 
 
-def extract_gear_from_html(html):
+def extract_gear_from_html(html, max_slots=GEAR_MAX_SLOTS):
     """
     Try to extract equipment slots (name, basic/advanced attributes) from the page.
     Returns list of {"slot": str, "name": str, "basic_attributes": str, "advanced_attributes": str, "image_url": str or None}.
     """
+    return extract_gear_from_scripts(tokenize_guide(html).scripts, max_slots)
+
+
+def _attr_text(value):
+    if isinstance(value, dict):
+        value = " ".join("%s %s" % (k, v) for k, v in value.items())
+    return str(value) if value else ""
+
+
+def _gear_entry(obj, slot_hint):
+    """Gear slot dict for a JSON object, or None when it has no name/attributes."""
+    name = obj.get("name") or obj.get("title") or ""
+    basic = _attr_text(obj.get("basicAttributes") or obj.get("basic_attributes") or "")
+    advanced = _attr_text(obj.get("advancedAttributes") or obj.get("advanced_attributes") or "")
+    if not (name or basic or advanced):
+        return None
+    url = obj.get("imageUrl") or obj.get("image_url") or obj.get("icon")
+    return {
+        "slot": str(obj.get("slot") or obj.get("slotType") or slot_hint or "?"),
+        "name": str(name),
+        "basic_attributes": basic,
+        "advanced_attributes": advanced,
+        "image_url": url if isinstance(url, str) else None,
+    }
+
+
+def _is_gear_container(obj, entry, hint):
+    """Named dict with no slot or attributes of its own that holds nested objects (a set, a loadout)."""
+    if entry["slot"] != hint or entry["basic_attributes"] or entry["advanced_attributes"]:
+        return False
+    return any(isinstance(v, (dict, list)) and v for v in obj.values())
+
+
+def _walk_gear(root, slot_hint, gear_slots, seen, max_slots):
+    """
+    Iterative (explicit stack, document order) walk of one equipment subtree. A dict that
+    looks like a gear piece is recorded and not descended into, except for nested
+    equipment-like keys. Slot hints are just the enclosing key / list index.
+    Containers (see _is_gear_container) are descended into instead of recorded.
+    """
+    stack = [(root, slot_hint)]
+    while stack and len(gear_slots) < max_slots:
+        obj, hint = stack.pop()
+        if isinstance(obj, list):
+            stack.extend((v, str(i)) for i, v in reversed(list(enumerate(obj))) if isinstance(v, (dict, list)))
+            continue
+        if not isinstance(obj, dict):
+            continue
+        entry = _gear_entry(obj, hint)
+        if entry is not None and _is_gear_container(obj, entry, hint):
+            entry = None
+        if entry is not None:
+            key = (entry["slot"], entry["name"])
+            if key not in seen:
+                seen.add(key)
+                gear_slots.append(entry)
+            children = [(v, k) for k, v in obj.items() if isinstance(v, (dict, list)) and EQUIPMENT_KEY_RE.search(k)]
+        else:
+            children = [(v, k) for k, v in obj.items() if isinstance(v, (dict, list))]
+        stack.extend(reversed(children))
+
+
+def _gear_from_next_data(blob, gear_slots, seen, max_slots):
+    """
+    Decode only the values of equipment-like keys in the __NEXT_DATA__ JSON text
+    (json raw_decode at each key), so unrelated branches are never materialized.
+    """
+    decoder = json.JSONDecoder()
+    decoded_until = 0
+    for m in NEXT_DATA_EQUIPMENT_RE.finditer(blob):
+        if len(gear_slots) >= max_slots:
+            break
+        pos = m.end()
+        if pos < decoded_until or blob[pos:pos + 1] not in ("{", "["):
+            continue
+        quote = blob.rfind('"', 0, m.start())
+        if quote < 0 or blob[quote - 1:quote] == "\\":
+            continue
+        if NEXT_DATA_KEY_PREFIX_RE.match(blob, quote + 1, m.start()).end() != m.start():
+            continue    # keyword is inside a longer string, not a key
+        key = blob[quote + 1:m.end()].split('"', 1)[0]
+        try:
+            value, decoded_until = decoder.raw_decode(blob, pos)
+        except ValueError:
+            continue
+        _walk_gear(value, key, gear_slots, seen, max_slots)
+
+
+def extract_gear_from_scripts(scripts, max_slots=GEAR_MAX_SLOTS):
+    """extract_gear_from_html over already tokenized (attrs, body) script pairs."""
     gear_slots = []
+    seen = set()    # (slot, name)
     # Next.js / Gatsby style embedded JSON
-    m = re.search(r'<script[^>]*id="__NEXT_DATA__"[^>]*>([^<]+)</script>', html)
-    if m:
-        try:
-            data = json.loads(m.group(1))
-            def walk(obj, path=""):
-                if isinstance(obj, dict):
-                    name = obj.get("name") or obj.get("title") or ""
-                    slot = obj.get("slot") or obj.get("slotType") or path.split("/")[-1] or "?"
-                    basic = obj.get("basicAttributes") or obj.get("basic_attributes") or ""
-                    advanced = obj.get("advancedAttributes") or obj.get("advanced_attributes") or ""
-                    if isinstance(basic, dict):
-                        basic = " ".join("%s %s" % (k, v) for k, v in basic.items())
-                    if isinstance(advanced, dict):
-                        advanced = " ".join("%s %s" % (k, v) for k, v in advanced.items())
-                    if name or basic or advanced:
-                        url = obj.get("imageUrl") or obj.get("image_url") or obj.get("icon")
-                        gear_slots.append({
-                            "slot": str(slot),
-                            "name": str(name),
-                            "basic_attributes": str(basic) if basic else "",
-                            "advanced_attributes": str(advanced) if advanced else "",
-                            "image_url": url if isinstance(url, str) else None,
-                        })
-                    for k, v in obj.items():
-                        walk(v, path + "/" + k)
-                elif isinstance(obj, list):
-                    for i, v in enumerate(obj):
-                        walk(v, path + "/" + str(i))
-            walk(data)
-        except (json.JSONDecodeError, TypeError):
-            pass
+    next_data = next((body for attrs, body in scripts if attrs.get("id") == "__NEXT_DATA__"), None)
+    if next_data:
+        _gear_from_next_data(next_data, gear_slots, seen, max_slots)
 
-    for script in re.finditer(r"<script[^>]*>([^<]{300,})</script>", html):
-        content = script.group(1)
+    for attrs, content in scripts:
+        if len(gear_slots) >= max_slots:
+            break
+        if attrs.get("id") == "__NEXT_DATA__" or len(content) < 300 or "<" in content:
+            continue
         if "equipment" in content and ("name" in content or "Intellect" in content):
             for blob in re.finditer(r'\{"[^"]*"(?:slot|name|basicAttributes|advancedAttributes)[^}]+\}', content):
                 try:
                     o = json.loads(blob.group(0))
                     name = o.get("name") or o.get("title") or ""
                     if name:
+                        slot = o.get("slot") or o.get("slotType") or "?"
+                        if (str(slot), str(name)) in seen:
+                            continue
+                        seen.add((str(slot), str(name)))
                         gear_slots.append({
-                            "slot": o.get("slot") or o.get("slotType") or "?",
+                            "slot": slot,
                             "name": str(name),
                             "basic_attributes": str(o.get("basicAttributes") or o.get("basic_attributes") or ""),
                             "advanced_attributes": str(o.get("advancedAttributes") or o.get("advanced_attributes") or ""),
                             "image_url": o.get("imageUrl") or o.get("image") or None,
                         })
-                except (json.JSONDecodeError, TypeError):
+                        if len(gear_slots) >= max_slots:
+                            break
+                except (json.JSONDecodeError, TypeError, AttributeError):
                     pass
 
     return gear_slots
 
 
-def scrape_guide(url):
+def _result(error=None, **fields):
+    """Result dict with every key scrape_guide returns."""
+    result = {
+        "title": "", "gearing": "", "planner_url": "", "gear_slots": [], "food": "", "serum": "",
+        "error": error, "planner_error": None,
+    }
+    result.update(fields)
+    return result
+
+
+def _normalize_guide_url(url):
+    """Return (url, error) for a user-entered guide URL."""
+    if not url or "maxroll.gg" not in url:
+        return url, "Invalid or non-Maxroll URL"
+    url = url.strip()
+    if not url.startswith("http"):
+        url = "https://" + url
+    return url, None
+
+
+def _fetch_error(e):
+    """Short error message for a failed guide fetch."""
+    if isinstance(e, urllib.error.HTTPError):
+        return f"HTTP {e.code}"
+    if isinstance(e, urllib.error.URLError):
+        return str(e.reason) or "Network error"
+    return str(e)
+
+
+class ScrapeTimings:
+    """
+    Opt-in per-stage instrumentation for scrape_guide: wall time (ms), bytes and match
+    counts per stage. Every finished stage is passed to on_stage(name, record) when given
+    and logged at DEBUG on the "maxroll_scraper" logger.
+    """
+
+    STAGES = ("fetch_guide", "strip", "sections", "gear", "planner_id", "planner_fetch")
+    LABELS = {
+        "fetch_guide": "fetch", "strip": "strip", "sections": "sections", "gear": "gear",
+        "planner_id": "planner id", "planner_fetch": "planner", "parse_memo": "parse (memo)",
+    }
+
+    def __init__(self, on_stage=None, enabled=True):
+        self.on_stage = on_stage
+        self.enabled = enabled
+        self.stages = {}
+
+    def add(self, name, seconds, nbytes=0, matches=0):
+        """Record (or add to) one stage."""
+        if not self.enabled:
+            return
+        rec = self.stages.setdefault(name, {"ms": 0.0, "bytes": 0, "matches": 0})
+        rec["ms"] += seconds * 1000.0
+        rec["bytes"] += nbytes
+        rec["matches"] += matches
+
+    def finish(self, name):
+        """Report a completed stage to the callback / logger."""
+        rec = self.stages.get(name)
+        if rec is None:
+            return
+        rec["ms"] = round(rec["ms"], 1)
+        log.debug("%s: %.1f ms, %d bytes, %d matches", name, rec["ms"], rec["bytes"], rec["matches"])
+        if self.on_stage is not None:
+            self.on_stage(name, dict(rec))
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a block; the block may fill rec["bytes"] / rec["matches"]."""
+        rec = {"bytes": 0, "matches": 0}
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            self.add(name, time.perf_counter() - t0, rec["bytes"], rec["matches"])
+            self.finish(name)
+
+    def as_dict(self):
+        return {name: dict(rec) for name, rec in self.stages.items()}
+
+
+_NO_TIMINGS = ScrapeTimings(enabled=False)
+
+
+def format_timings(timings):
+    """One-line summary of a result's timings dict, e.g. "fetch 812ms (1.2MB) · strip 40ms · ..."."""
+    parts = []
+    for name, rec in timings.items():
+        part = "%s %dms" % (ScrapeTimings.LABELS.get(name, name), round(rec.get("ms", 0)))
+        nbytes = rec.get("bytes", 0)
+        if nbytes >= 1024 * 1024:
+            part += " (%.1fMB)" % (nbytes / (1024 * 1024))
+        elif nbytes >= 1024:
+            part += " (%dKB)" % (nbytes // 1024)
+        parts.append(part)
+    return " · ".join(parts)
+
+
+def _guide_fields_complete(page):
+    """True once a partially fed page has every field scrape_guide needs."""
+    if not page.title or not page.planner_id:
+        return False
+    text = page.text_so_far()
+    sections = extract_sections_from_text(text)
+    gearing = sections["gearing"]
+    if "Attributes:" not in gearing or "Legendary" not in gearing or not sections["food"]:
+        return False
+    serum = sections["serum"]
+    # Serum runs to the end of the text until its terminator has been streamed in
+    return bool(serum) and not text.rstrip().endswith(serum)
+
+
+def fetch_guide_page(url, timeout=15, use_cache=True, max_bytes=FETCH_MAX_BYTES, early_exit=False):
+    """
+    Stream a guide page straight into GuidePageParser (the HTML is never held as one string)
+    and return the closed parser. With early_exit, reading stops as soon as title, planner ID,
+    Food/Serum and the attribute lists have all been seen (page.stopped_early is then True;
+    gear embedded further down the page is not seen, so the planner fetch supplies it).
+    """
+    return read_guide_page(URLStream(url, timeout, use_cache, max_bytes), early_exit)
+
+
+def read_guide_page(stream, early_exit=False, timings=_NO_TIMINGS, on_planner_id=None):
+    """
+    fetch_guide_page over an already opened URLStream (closed when done).
+    Reading and tokenizing interleave; timings gets their separate totals as the
+    "fetch_guide" and "strip" stages. on_planner_id(id) is called once, mid-stream,
+    as soon as the page's planner build ID has been seen.
+    """
+    page = GuidePageParser()
+    chunks = iter(stream)
+    fed = 0
+    next_check = EARLY_EXIT_CHECK_BYTES
+    t_read = t_feed = 0.0
+    try:
+        t0 = time.perf_counter()
+        for chunk in chunks:
+            t1 = time.perf_counter()
+            t_read += t1 - t0
+            page.feed(chunk)
+            fed += len(chunk)
+            if on_planner_id is not None and page.planner_id:
+                on_planner_id(page.planner_id)
+                on_planner_id = None
+            if early_exit and fed >= next_check:
+                next_check = fed * 2
+                if _guide_fields_complete(page):
+                    page.stopped_early = True
+                    break
+            t0 = time.perf_counter()
+            t_feed += t0 - t1
+        else:
+            t_read += time.perf_counter() - t0
+    finally:
+        chunks.close()
+        stream.close()
+    t1 = time.perf_counter()
+    page.close()
+    t_feed += time.perf_counter() - t1
+    timings.add("fetch_guide", t_read, stream.bytes_read)
+    timings.finish("fetch_guide")
+    timings.add("strip", t_feed, len(page.text), len(page.scripts))
+    timings.finish("strip")
+    return page
+
+
+def parse_guide_html(url, html):
+    """
+    Run every extractor over a fetched guide page (no network).
+    Returns the scrape_guide result dict; gear_slots holds only gear found on the guide itself.
+    """
+    return parse_guide_page(url, tokenize_guide(html))
+
+
+def parse_guide_page(url, page, timings=_NO_TIMINGS):
+    """parse_guide_html over an already tokenized (closed) GuidePageParser."""
+    # Title
+    title = re.sub(r"\s*-\s*Blue Protocol.*$", "", page.title, flags=re.IGNORECASE).strip()
+    if not title:
+        slug_m = re.search(r"maxroll\.gg/[^/]+/[^/]+/([^/?#]+)", url)
+        if slug_m:
+            title = slug_m.group(1).replace("-", " ").title()
+
+    with timings.stage("sections") as rec:
+        sections = extract_sections_from_text(page.text)
+        rec["bytes"] = len(page.text)
+        rec["matches"] = sum(1 for v in sections.values() if v)
+    with timings.stage("gear") as rec:
+        gear_slots = extract_gear_from_scripts(page.scripts)
+        rec["bytes"] = sum(len(body) for _, body in page.scripts)
+        rec["matches"] = len(gear_slots)
+
+    # Planner build ID (class image opens .../planner/{id}) — hover on guide shows item tooltip; full gear is on planner page
+    with timings.stage("planner_id") as rec:
+        build_id = page.planner_id
+        planner_url = PLANNER_URL.format(build_id) if build_id else ""
+        rec["matches"] = 1 if build_id else 0
+
+    return _result(
+        title=title,
+        gearing=sections["gearing"],
+        planner_url=planner_url,
+        gear_slots=gear_slots,
+        food=sections["food"],
+        serum=sections["serum"],
+    )
+
+
+def scrape_guide(url, early_exit=False, max_bytes=FETCH_MAX_BYTES, timings=False, on_stage=None,
+                 prefetch_planner=True):
     """
     Fetch a Maxroll Blue Protocol build guide URL and return:
     - title: guide title
@@ -181,65 +1665,460 @@ def scrape_guide(url):
     - gear_slots: list of {slot, name, basic_attributes, advanced_attributes, image_url} when present
     - food, serum: recommended consumables
     - error: None or error message
+    - planner_error: None, or why the planner page (needed for gear_slots) could not be read;
+      gear_slots is then empty because it is unknown, not because the build has no gear
+    The page is streamed and capped at max_bytes; early_exit stops reading once every field above
+    except gear_slots is found (gear then comes from the planner page).
+    With timings=True the result also has "timings": {stage: {"ms", "bytes", "matches"}}
+    (see ScrapeTimings; format_timings makes a one-line summary). on_stage(name, record)
+    is called as each stage finishes.
+    With prefetch_planner, the planner request starts on a background thread as soon as the
+    build ID shows up in the streaming guide, so it overlaps the rest of the guide download
+    and parsing; it is only waited for when the guide itself has no gear.
     """
-    if not url or "maxroll.gg" not in url:
-        return {
-            "title": "", "gearing": "", "planner_url": "", "gear_slots": [], "food": "", "serum": "",
-            "error": "Invalid or non-Maxroll URL",
-        }
+    url, error = _normalize_guide_url(url)
+    if error:
+        return _result(error)
+    timer = ScrapeTimings(on_stage) if (timings or on_stage or log.isEnabledFor(logging.DEBUG)) else _NO_TIMINGS
+    prefetch = []
 
-    url = url.strip()
-    if not url.startswith("http"):
-        url = "https://" + url
+    def start_prefetch(build_id):
+        prefetch.append(PlannerPrefetch(PLANNER_URL.format(build_id), max_bytes=max_bytes))
 
     try:
-        html = fetch_url(url)
-    except urllib.error.HTTPError as e:
-        return {"title": "", "gearing": "", "planner_url": "", "gear_slots": [], "food": "", "serum": "", "error": f"HTTP {e.code}"}
-    except urllib.error.URLError as e:
-        return {"title": "", "gearing": "", "planner_url": "", "gear_slots": [], "food": "", "serum": "", "error": str(e.reason) or "Network error"}
+        t0 = time.perf_counter()
+        stream = URLStream(url, max_bytes=max_bytes)
+        timer.add("fetch_guide", time.perf_counter() - t0)
+        result = _memo_guide(url, stream, early_exit, timer, start_prefetch if prefetch_planner else None)
     except Exception as e:
-        return {"title": "", "gearing": "", "planner_url": "", "gear_slots": [], "food": "", "serum": "", "error": str(e)}
+        return _result(_fetch_error(e))
 
-    # Title
-    title = ""
-    tit_m = re.search(r"<title[^>]*>([^<]+)</title>", html, re.IGNORECASE)
-    if tit_m:
-        title = re.sub(r"\s*-\s*Blue Protocol.*$", "", tit_m.group(1), flags=re.IGNORECASE).strip()
-    if not title:
-        slug_m = re.search(r"maxroll\.gg/[^/]+/[^/]+/([^/?#]+)", url)
-        if slug_m:
-            title = slug_m.group(1).replace("-", " ").title()
+    # Optionally fetch planner page to try to get gear name + basic/advanced attributes (often loaded by JS)
+    if result["planner_url"] and not result["gear_slots"]:
+        with timer.stage("planner_fetch") as rec:
+            try:
+                if prefetch and prefetch[0].url == result["planner_url"]:
+                    result["gear_slots"] = prefetch[0].wait(rec)
+                else:
+                    result["gear_slots"] = fetch_planner_gear(result["planner_url"], max_bytes=max_bytes, rec=rec)
+            except Exception as e:
+                result["planner_error"] = _fetch_error(e)
+            rec["matches"] = len(result["gear_slots"])
+    if timings:
+        result["timings"] = timer.as_dict()
+    return result
 
-    # Body text (strip scripts for gearing/food/serum)
-    text = re.sub(r"<script[^>]*>.*?</script>", " ", html, flags=re.IGNORECASE | re.DOTALL)
-    text = re.sub(r"<style[^>]*>.*?</style>", " ", text, flags=re.IGNORECASE | re.DOTALL)
-    text = re.sub(r"<[^>]+>", " ", text)
-    text = re.sub(r"&\w+;|&#\d+;", " ", text)
-    text = re.sub(r"\s+", " ", text)
 
-    sections = extract_sections_from_text(text)
-    gear_slots = extract_gear_from_html(html)
+def _memo_guide(url, stream, early_exit=False, timings=_NO_TIMINGS, on_planner_id=None):
+    """
+    parse_guide_page for an opened guide URLStream. A body already seen (same sha256, same
+    EXTRACTOR_VERSION) is answered from the ParseMemo without tokenizing it again.
+    """
+    memo = get_parse_memo()
+    if stream.digest:
+        with timings.stage("parse_memo") as rec:
+            hit = memo.get(memo.key("guide", url, stream.digest))
+            rec["bytes"] = stream.body_size
+            rec["matches"] = 1 if hit is not None else 0
+        if hit is not None:
+            stream.close()
+            timings.add("fetch_guide", 0, stream.body_size)
+            timings.finish("fetch_guide")
+            return hit
+    result = parse_guide_page(url, read_guide_page(stream, early_exit, timings, on_planner_id), timings)
+    # digest is only set once the body was read to the end (never for an early exit)
+    if stream.digest:
+        memo.put(memo.key("guide", url, stream.digest), result)
+    return result
 
-    # Planner build ID (class image opens .../planner/{id}) — hover on guide shows item tooltip; full gear is on planner page
-    planner_url = ""
-    build_id = extract_planner_build_id(html)
-    if build_id:
-        planner_url = f"https://maxroll.gg/blue-protocol/planner/{build_id}"
-        # Optionally fetch planner page to try to get gear name + basic/advanced attributes (often loaded by JS)
-        if not gear_slots:
-            try:
-                planner_html = fetch_url(planner_url)
-                gear_slots = extract_gear_from_html(planner_html)
-            except Exception:
-                pass
 
-    return {
-        "title": title,
-        "gearing": sections["gearing"],
-        "planner_url": planner_url,
-        "gear_slots": gear_slots,
-        "food": sections["food"],
-        "serum": sections["serum"],
-        "error": None,
-    }
+def fetch_planner_gear(planner_url, timeout=15, max_bytes=FETCH_MAX_BYTES, rec=None):
+    """
+    Fetch a planner page and return its gear slots (memoized by body hash like guides).
+    rec (a timings record) gets the body size in "bytes".
+    """
+    memo = get_parse_memo()
+    stream = URLStream(planner_url, timeout, max_bytes=max_bytes)
+    if stream.digest:
+        hit = memo.get(memo.key("planner", planner_url, stream.digest))
+        if hit is not None:
+            stream.close()
+            if rec is not None:
+                rec["bytes"] = stream.body_size
+            return hit
+    try:
+        html = "".join(stream)
+    finally:
+        stream.close()
+    if rec is not None:
+        rec["bytes"] = stream.bytes_read
+    return _memo_planner_html(planner_url, html, stream.digest)
+
+
+class PlannerPrefetch:
+    """
+    fetch_planner_gear on a daemon thread; wait() returns its gear slots or re-raises its error.
+    It overlaps the guide download, so it opens a second connection rather than reusing the
+    guide's; both go back to the pool for later fetches (refreshes, the next import).
+    """
+
+    def __init__(self, planner_url, timeout=15, max_bytes=FETCH_MAX_BYTES):
+        self.url = planner_url
+        self._rec = {"bytes": 0}
+        self._gear_slots = None
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, args=(timeout, max_bytes), name="planner-prefetch", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, timeout, max_bytes):
+        try:
+            self._gear_slots = fetch_planner_gear(self.url, timeout, max_bytes, self._rec)
+        except Exception as e:
+            self._error = e
+
+    def wait(self, rec=None):
+        self._thread.join()
+        if rec is not None:
+            rec["bytes"] = self._rec["bytes"]
+        if self._error is not None:
+            raise self._error
+        return self._gear_slots
+
+
+def _memo_planner_html(planner_url, html, digest=None):
+    memo = get_parse_memo()
+    key = memo.key("planner", planner_url, digest or _text_digest(html))
+    gear_slots = memo.get(key)
+    if gear_slots is None:
+        gear_slots = extract_gear_from_html(html)
+        memo.put(key, gear_slots)
+    return gear_slots
+
+
+def _memo_guide_html(url, html):
+    """parse_guide_html through the ParseMemo (for callers that already hold the HTML)."""
+    memo = get_parse_memo()
+    key = memo.key("guide", url, _text_digest(html))
+    result = memo.get(key)
+    if result is None:
+        result = parse_guide_html(url, html)
+        memo.put(key, result)
+    return result
+
+
+def _text_digest(html):
+    # Same as the body digest whenever the body was valid UTF-8
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def reextract_guide(url, archive=None):
+    """
+    scrape_guide from the snapshot archive instead of the network: the newest archived guide
+    body (and planner body, when the guide has no gear) run through the current extractors.
+    """
+    url, error = _normalize_guide_url(url)
+    if error:
+        return _result(error)
+    archive = archive or get_snapshot_archive() or SnapshotArchive()
+    html = archive.read_latest(url)
+    if html is None:
+        return _result("No archived snapshot")
+    result = parse_guide_html(url, html)
+    if result["planner_url"] and not result["gear_slots"]:
+        planner_html = archive.read_latest(result["planner_url"])
+        if planner_html is not None:
+            result["gear_slots"] = extract_gear_from_html(planner_html)
+        else:
+            result["planner_error"] = "No archived planner snapshot"
+    return result
+
+
+class TokenBucket:
+    """Token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate=ASYNC_RATE_PER_HOST, burst=ASYNC_BURST_PER_HOST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """One TokenBucket per host name."""
+
+    def __init__(self, rate=ASYNC_RATE_PER_HOST, burst=ASYNC_BURST_PER_HOST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+
+    async def acquire(self, url):
+        host = urllib.parse.urlsplit(url).hostname or ""
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        await bucket.acquire()
+
+
+def _retry_delay(attempt, error):
+    """Jittered exponential backoff; honours a numeric Retry-After header."""
+    retry_after = error.headers.get("Retry-After") if getattr(error, "headers", None) else None
+    if retry_after and retry_after.strip().isdigit():
+        return min(ASYNC_BACKOFF_MAX, float(retry_after))
+    delay = min(ASYNC_BACKOFF_MAX, ASYNC_BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.5)
+
+
+async def _run_in_thread(func, *args):
+    """
+    func(*args) on the default executor. If the caller is cancelled, wait for the thread to
+    finish before re-raising, so whatever the caller holds (a semaphore slot) stays held
+    while the call is still running.
+    """
+    future = asyncio.get_running_loop().run_in_executor(None, func, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait([future])
+        raise
+
+
+async def fetch_url_async(url, limiter=None, timeout=15, retries=ASYNC_RETRIES):
+    """
+    fetch_url on a worker thread, rate-limited per host, with retry on 429/5xx and network
+    errors (including timeouts). timeout is fetch_url's socket timeout; there is no outer
+    timeout, since a thread cannot be cancelled and retrying would pile up live fetches.
+    Raises the last error when retries run out.
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            await limiter.acquire(url)
+        try:
+            return await _run_in_thread(fetch_url, url, timeout)
+        except urllib.error.HTTPError as e:
+            if e.code not in RETRY_STATUS or attempt >= retries:
+                raise
+            delay = _retry_delay(attempt, e)
+        except (urllib.error.URLError, socket.timeout) as e:
+            # Only network failures; not "unsupported URL", "too many redirects" and the like
+            if attempt >= retries or (isinstance(e, urllib.error.URLError) and not isinstance(e.reason, OSError)):
+                raise
+            delay = _retry_delay(attempt, None)
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+async def scrape_guide_async(url, limiter=None, timeout=15, retries=ASYNC_RETRIES):
+    """Async scrape_guide: same result dict, fetches go through fetch_url_async."""
+    url, error = _normalize_guide_url(url)
+    if error:
+        return _result(error)
+    if limiter is None:
+        limiter = HostRateLimiter()
+
+    try:
+        html = await fetch_url_async(url, limiter, timeout, retries)
+    except Exception as e:
+        return _result(_fetch_error(e))
+
+    result = await _run_in_thread(_memo_guide_html, url, html)
+    if result["planner_url"] and not result["gear_slots"]:
+        try:
+            planner_html = await fetch_url_async(result["planner_url"], limiter, timeout, retries)
+            result["gear_slots"] = await _run_in_thread(_memo_planner_html, result["planner_url"], planner_html)
+        except Exception as e:
+            result["planner_error"] = _fetch_error(e)
+    return result
+
+
+async def scrape_guides_async(urls, concurrency=ASYNC_CONCURRENCY, rate_per_host=ASYNC_RATE_PER_HOST,
+                              burst_per_host=ASYNC_BURST_PER_HOST, timeout=15, retries=ASYNC_RETRIES):
+    """
+    Scrape many guides concurrently (at most `concurrency` at once, rate-limited per host).
+    Returns result dicts in the same order as urls.
+    """
+    limiter = HostRateLimiter(rate_per_host, burst_per_host)
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(url):
+        async with sem:
+            return await scrape_guide_async(url, limiter, timeout, retries)
+
+    return await asyncio.gather(*(one(u) for u in urls))
+
+
+# ── Offline extraction (CLI) ──
+
+GUIDE_FILE_EXTENSIONS = (".html", ".htm")
+# Browsers keep the page URL in "Save page as" output; used for title fallback and the result's url
+SAVED_URL_RE = re.compile(
+    r"""<link[^>]+rel=["']canonical["'][^>]+href=["']([^"']+)|<!-- saved from url=\(\d+\)(\S+) -->""",
+    re.IGNORECASE,
+)
+
+
+def _saved_page_url(html, path):
+    m = SAVED_URL_RE.search(html, 0, 64 * 1024)
+    if m:
+        return m.group(1) or m.group(2)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return MAXROLL_BASE + "/blue-protocol/build-guides/" + stem
+
+
+def extract_file(path):
+    """
+    parse_guide_html over a saved guide page (no network, no memo).
+    Returns the result dict plus "file", "url" and "ms"; failures land in "error".
+    """
+    t0 = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            html = f.read().decode("utf-8", errors="replace")
+        url = _saved_page_url(html, path)
+        result = parse_guide_html(url, html)
+    except Exception as e:
+        url = ""
+        result = _result(f"{type(e).__name__}: {e}")
+    result["file"] = path
+    result["url"] = url
+    result["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+
+
+def iter_guide_files(directory):
+    """Saved guide pages under directory (recursive, sorted)."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(GUIDE_FILE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def _extract_failed(path, error):
+    result = _result(error)
+    result.update(file=path, url="", ms=0.0)
+    return result
+
+
+def _extract_pool(pending, jobs, crashed):
+    """
+    Yield extract_file results for paths taken from the pending deque, keeping at most `jobs`
+    files in flight. If a worker dies the pool is broken: the files in flight go to crashed
+    and this returns, leaving the rest in pending for a fresh pool.
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while pending or running:
+            while pending and len(running) < jobs:
+                path = pending.popleft()
+                running[pool.submit(extract_file, path)] = path
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                path = running.pop(future)
+                try:
+                    yield future.result()
+                except concurrent.futures.BrokenExecutor:    # BrokenProcessPool: a worker died
+                    crashed.append(path)
+                    broken = True
+                except Exception as e:
+                    yield _extract_failed(path, f"{type(e).__name__}: {e}")
+            if broken:
+                crashed.extend(running.values())
+                return
+
+
+def extract_dir(directory, jobs=None):
+    """
+    Yield extract_file results for every saved page under directory, in completion order.
+    Files are spread over a ProcessPoolExecutor of `jobs` workers (default: CPU count);
+    jobs=1 runs in this process. A worker that dies (killed, out of memory) breaks only its
+    pool: the other files carry on in a fresh one, and the files that were in flight are
+    retried one at a time so only the one that kills its worker is reported as failed.
+    """
+    paths = list(iter_guide_files(directory))
+    if jobs == 1 or len(paths) <= 1:
+        for path in paths:
+            yield extract_file(path)
+        return
+    pending = collections.deque(paths)
+    suspects = []
+    while pending:
+        yield from _extract_pool(pending, jobs or os.cpu_count() or 1, suspects)
+    for path in suspects:
+        crashed = []
+        yield from _extract_pool(collections.deque([path]), 1, crashed)
+        if crashed:
+            yield _extract_failed(path, "BrokenProcessPool: the worker process died on this file")
+
+
+def _cmd_extract_dir(args):
+    if not os.path.isdir(args.directory):
+        print(f"not a directory: {args.directory}", file=sys.stderr)
+        return 2
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    count = errors = 0
+    t0 = time.perf_counter()
+    try:
+        for result in extract_dir(args.directory, args.jobs):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            count += 1
+            errors += result["error"] is not None
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{count} files, {errors} errors in {elapsed:.2f}s ({rate:.1f} files/sec)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def _cmd_reextract(args):
+    archive = get_snapshot_archive() or SnapshotArchive()
+    urls = args.urls or [u for u in archive.urls() if "/planner/" not in u]
+    errors = 0
+    for url in urls:
+        result = reextract_guide(url, archive)
+        result["url"] = url
+        print(json.dumps(result), flush=True)
+        errors += result["error"] is not None
+    print(f"{len(urls)} guides re-extracted, {errors} errors", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="maxroll_scraper", description="Maxroll guide extraction tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("extract-dir", help="extract every saved guide page in a directory (JSONL)")
+    p.add_argument("directory")
+    p.add_argument("--jobs", "-j", type=int, default=None, help="worker processes (default: CPU count)")
+    p.add_argument("--output", "-o", help="write JSONL here instead of stdout")
+    p.set_defaults(func=_cmd_extract_dir)
+
+    p = commands.add_parser("reextract", help="re-run extraction over archived guide snapshots (JSONL)")
+    p.add_argument("urls", nargs="*", help="guide URLs (default: every archived guide)")
+    p.set_defaults(func=_cmd_reextract)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
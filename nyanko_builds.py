@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Build library for Nyanko Protocol: every imported Maxroll build, keyed by guide URL,
+with an inverted index over title, gearing, gear names/attributes, food and serum
+so the Build tab can filter on every keystroke.
+"""
+
+import re
+import time
+import bisect
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Fields copied from a scrape_guide result into a library record
+RECORD_FIELDS = ("title", "gearing", "planner_url", "gear_slots", "food", "serum")
+
+
+def build_id(url):
+    """Library key for a guide URL (scheme, query, fragment, case and trailing slash ignored)."""
+    url = (url or "").strip().lower()
+    url = re.sub(r"^[a-z]+://", "", url)
+    url = re.split(r"[?#]", url, maxsplit=1)[0]
+    return url.rstrip("/")
+
+
+def build_record(url, result):
+    """Library record for a scrape_guide result (or another record)."""
+    record = {"url": url, "imported_at": result.get("imported_at") or time.time()}
+    for field in RECORD_FIELDS:
+        record[field] = result.get(field) or ([] if field == "gear_slots" else "")
+    return record
+
+
+def record_text(record):
+    """Everything searchable in a record, as one string."""
+    parts = [record.get("title", ""), record.get("gearing", ""), record.get("food", ""), record.get("serum", "")]
+    for g in record.get("gear_slots") or []:
+        parts += [g.get("slot") or "", g.get("name") or "",
+                  g.get("basic_attributes") or "", g.get("advanced_attributes") or ""]
+    return " ".join(parts)
+
+
+def tokenize(text):
+    return set(TOKEN_RE.findall(text.lower()))
+
+
+class BuildIndex:
+    """
+    Inverted index: token -> set of build ids, plus a sorted vocabulary so each query
+    word matches as a prefix (bisect, no scan). add/remove touch only that build's tokens.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._vocab = []
+        self._tokens = {}   # build id -> its tokens, for removal
+
+    def add(self, bid, text):
+        if bid in self._tokens:
+            self.remove(bid)
+        tokens = tokenize(text)
+        self._tokens[bid] = tokens
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                bisect.insort(self._vocab, token)
+            ids.add(bid)
+
+    def remove(self, bid):
+        for token in self._tokens.pop(bid, ()):
+            ids = self._postings[token]
+            ids.discard(bid)
+            if not ids:
+                del self._postings[token]
+                i = bisect.bisect_left(self._vocab, token)
+                del self._vocab[i]
+
+    def _prefix(self, prefix):
+        ids = set()
+        i = bisect.bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            ids |= self._postings[self._vocab[i]]
+            i += 1
+        return ids
+
+    def search(self, query):
+        """Ids matching every word of query (each as a prefix); None for an empty query."""
+        words = sorted(set(TOKEN_RE.findall(query.lower())), key=len, reverse=True)
+        if not words:
+            return None
+        result = None
+        for word in words:     # longest (most selective) first
+            ids = self._prefix(word)
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
+
+
+class BuildLibrary:
+    """
+    Imported builds: `builds` maps build_id -> record (the dict is stored as-is in the save
+    file) and the BuildIndex is kept in step with every put/delete. When a put changes a
+    build's content, the old content is kept as record["previous"] for previous_diff().
+    Structured Build models are parsed once per record and cached.
+    """
+
+    def __init__(self, builds=None):
+        self.builds = builds if builds is not None else {}
+        self.index = BuildIndex()
+        self._models = {}
+        for bid, record in self.builds.items():
+            self.index.add(bid, record_text(record))
+
+    def __len__(self):
+        return len(self.builds)
+
+    def get(self, bid):
+        return self.builds.get(bid)
+
+    def put(self, url, result):
+        """Add or replace the build for url; returns its id."""
+        bid = build_id(url)
+        record = build_record(url, result)
+        old = self.builds.get(bid)
+        if old is not None:
+            if any(old.get(f) != record[f] for f in RECORD_FIELDS):
+                record["previous"] = {f: old.get(f) for f in RECORD_FIELDS}
+            elif old.get("previous"):
+                record["previous"] = old["previous"]
+        self.builds[bid] = record
+        self.index.add(bid, record_text(record))
+        self._models.pop(bid, None)
+        return bid
+
+    def delete(self, bid):
+        if self.builds.pop(bid, None) is not None:
+            self.index.remove(bid)
+            self._models.pop(bid, None)
+
+    def model(self, bid):
+        """Cached Build for a library id (None when missing)."""
+        build = self._models.get(bid)
+        if build is None:
+            record = self.builds.get(bid)
+            if record is None:
+                return None
+            build = self._models[bid] = Build.from_record(record)
+        return build
+
+    def diff(self, old_bid, new_bid):
+        """BuildDiff between two library builds, slot by slot."""
+        old = self.model(old_bid)
+        new = self.model(new_bid)
+        if old is None or new is None:
+            return None
+        return diff_builds(old, new)
+
+    def previous_diff(self, bid):
+        """What the last content-changing import/refresh of bid changed (None if nothing recorded)."""
+        record = self.builds.get(bid)
+        if not record or not record.get("previous"):
+            return None
+        return diff_builds(Build.from_record(record["previous"]), self.model(bid))
+
+    def search(self, query=""):
+        """Ids of builds matching query, most recently imported first."""
+        ids = self.index.search(query)
+        if ids is None:
+            ids = self.builds.keys()
+        return sorted(ids, key=lambda bid: self.builds[bid].get("imported_at", 0), reverse=True)
+
+
+# ── Structured gear model ──
+
+# "ATK 1,200", "Crit Rate: +3.5%", "Intellect 45" -> (stat, value); a trailing % stays on the stat name.
+# Commas only group thousands ("1,200"); "." is the only decimal point.
+ATTR_RE = re.compile(r"([A-Za-z][A-Za-z .'/-]*?)\s*[:=]?\s*\+?(-?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?)\s*(%?)")
+# What may sit between parsed attributes without being lost by showing only the pairs
+ATTR_SEP_RE = re.compile(r"[\s,;|]*")
+
+
+def _attribute_matches(text):
+    """(match, stat) for every "stat value" in text."""
+    for m in ATTR_RE.finditer(text or ""):
+        stat = m.group(1).strip(" .-")
+        if stat:
+            yield m, stat + " %" if m.group(3) else stat
+
+
+def parse_attributes(text):
+    """Free attribute text -> tuple of (stat, value) pairs, in order (unparseable parts are skipped)."""
+    return tuple((stat, float(m.group(2).replace(",", ""))) for m, stat in _attribute_matches(text))
+
+
+def format_value(value):
+    return "%d" % value if value == int(value) else "%g" % value
+
+
+def format_stat(stat, value):
+    """("Crit %", 3.0) -> "Crit 3%", ("ATK", 120.0) -> "ATK 120"."""
+    if stat.endswith(" %"):
+        return "%s %s%%" % (stat[:-2], format_value(value))
+    return "%s %s" % (stat, format_value(value))
+
+
+def format_attributes(pairs):
+    return ", ".join(format_stat(stat, value) for stat, value in pairs)
+
+
+def format_attribute_text(text):
+    """
+    Attribute text for display: the parsed pairs, normalized, when they cover all of it;
+    otherwise the raw text, so parts like "+8% Crit DMG" are never dropped.
+    """
+    text = text or ""
+    pos = 0
+    pairs = []
+    for m, stat in _attribute_matches(text):
+        if not ATTR_SEP_RE.fullmatch(text, pos, m.start()):
+            return text
+        pairs.append((stat, float(m.group(2).replace(",", ""))))
+        pos = m.end()
+    if not pairs or not ATTR_SEP_RE.fullmatch(text, pos):
+        return text
+    return format_attributes(pairs)
+
+
+class GearPiece:
+    """One equipped item: slot, name and parsed (stat, value) attribute pairs."""
+
+    __slots__ = ("slot", "name", "basic", "advanced", "image_url", "key")
+
+    def __init__(self, slot, name, basic=(), advanced=(), image_url=None):
+        self.slot = slot
+        self.name = name
+        self.basic = basic
+        self.advanced = advanced
+        self.image_url = image_url
+        self.key = (name, basic, advanced)  # equal keys -> nothing to diff
+
+    @classmethod
+    def from_dict(cls, d):
+        """From a scrape_guide gear_slots entry."""
+        return cls(
+            d.get("slot") or "?",
+            d.get("name") or "",
+            parse_attributes(d.get("basic_attributes")),
+            parse_attributes(d.get("advanced_attributes")),
+            d.get("image_url"),
+        )
+
+    def stats(self):
+        """stat -> value over basic and advanced attributes (repeated stats add up)."""
+        totals = {}
+        for stat, value in self.basic + self.advanced:
+            totals[stat] = totals.get(stat, 0.0) + value
+        return totals
+
+
+class Build:
+    """A library record as structured data: gear is slot -> GearPiece (first piece wins per slot)."""
+
+    __slots__ = ("title", "gearing", "food", "serum", "gear")
+
+    def __init__(self, title, gearing, food, serum, gear):
+        self.title = title
+        self.gearing = gearing
+        self.food = food
+        self.serum = serum
+        self.gear = gear
+
+    @classmethod
+    def from_record(cls, record):
+        gear = {}
+        for d in record.get("gear_slots") or []:
+            piece = GearPiece.from_dict(d)
+            if piece.slot not in gear:
+                gear[piece.slot] = piece
+        return cls(record.get("title") or "", record.get("gearing") or "",
+                   record.get("food") or "", record.get("serum") or "", gear)
+
+
+# ── Diff engine ──
+
+class SlotChange:
+    """
+    kind is "added", "removed" or "changed". stats holds (stat, old, new) for every stat whose
+    value differs (None on the side that lacks it).
+    """
+
+    __slots__ = ("slot", "kind", "old", "new", "stats")
+
+    def __init__(self, slot, kind, old=None, new=None, stats=()):
+        self.slot = slot
+        self.kind = kind
+        self.old = old
+        self.new = new
+        self.stats = stats
+
+
+class BuildDiff:
+    """Changed top-level fields as (field, old, new) plus per-slot SlotChanges."""
+
+    __slots__ = ("fields", "slots")
+
+    def __init__(self, fields, slots):
+        self.fields = fields
+        self.slots = slots
+
+    def __bool__(self):
+        return bool(self.fields or self.slots)
+
+    def summary(self):
+        """Short text like "3 slots, food changed"."""
+        parts = []
+        if self.slots:
+            parts.append("%d slot%s" % (len(self.slots), "" if len(self.slots) == 1 else "s"))
+        parts += ["%s changed" % field for field, _, _ in self.fields]
+        return ", ".join(parts) or "no changes"
+
+
+DIFF_FIELDS = ("title", "gearing", "food", "serum")
+
+
+def diff_stats(old, new):
+    a = old.stats()
+    b = new.stats()
+    changes = []
+    for stat in list(a) + [s for s in b if s not in a]:
+        before = a.get(stat)
+        after = b.get(stat)
+        if before != after:
+            changes.append((stat, before, after))
+    return tuple(changes)
+
+
+def diff_builds(old, new):
+    """BuildDiff from Build old to Build new; identical slots cost one tuple comparison."""
+    fields = [(f, getattr(old, f), getattr(new, f)) for f in DIFF_FIELDS if getattr(old, f) != getattr(new, f)]
+    slots = []
+    for slot, piece in old.gear.items():
+        other = new.gear.get(slot)
+        if other is None:
+            slots.append(SlotChange(slot, "removed", old=piece))
+        elif other.key != piece.key:
+            slots.append(SlotChange(slot, "changed", piece, other, diff_stats(piece, other)))
+    for slot, piece in new.gear.items():
+        if slot not in old.gear:
+            slots.append(SlotChange(slot, "added", new=piece))
+    return BuildDiff(fields, slots)
@@ -15,15 +15,28 @@ import sys
 import json
 import time
 import random
+import itertools
 import shutil
+import queue
+import threading
 from io import StringIO
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+from nyanko_storage import FileLock, Journal, WriteBehindSaver, file_stat, write_atomic, dump_json, dump_json_compact
+from nyanko_scoring import priority_weights, score_builds
+from nyanko_builds import BuildLibrary, GearPiece, build_id, build_record, format_attribute_text, format_stat, format_value
+
 try:
-    from maxroll_scraper import scrape_guide
+    from maxroll_scraper import scrape_guide, format_timings, reextract_guide
 except ImportError:
     scrape_guide = None
+    reextract_guide = None
+
+try:
+    from nyanko_sqlite import SqliteStore
+except ImportError:     # Python built without sqlite3
+    SqliteStore = None
 
 # ── Windows check & ANSI enable ──────────────────────────────
 if sys.platform != "win32":
@@ -45,6 +58,7 @@ try:
     from rich.console import Console
     from rich.panel import Panel
     from rich.table import Table
+    from rich.markup import escape
     from rich import box
 except ImportError:
     print("(=^・ω・^=) Installing 'rich' library... hold on, nya~!")
@@ -52,6 +66,7 @@ except ImportError:
     from rich.console import Console
     from rich.panel import Panel
     from rich.table import Table
+    from rich.markup import escape
     from rich import box
 
 console = Console(highlight=False)
@@ -178,6 +193,39 @@ def last_weekly_reset():
     return result
 
 
+CLOCK_JUMP = 2.0    # seconds the wall clock may drift from time.monotonic() before it counts as a jump
+
+
+def utc_offset():
+    return datetime.now().astimezone().utcoffset()
+
+
+class ResetScheduler:
+    """
+    Knows the next reset boundary as a timestamp, so checking it each frame is one comparison.
+    The boundary is recomputed after it passes, or when the clock jumps: the wall clock moved
+    against time.monotonic() (sleep/resume, manual change) or the UTC offset changed (DST,
+    time zone). due() is True whenever a reset may have happened; apply_resets() decides.
+    """
+
+    def __init__(self):
+        self.recompute()
+
+    def recompute(self):
+        self.next_reset = min(next_daily_reset(), next_weekly_reset())
+        self._deadline = self.next_reset.timestamp()
+        self._wall = time.time()
+        self._mono = time.monotonic()
+        self._offset = utc_offset()
+
+    def clock_jumped(self):
+        drift = (time.time() - self._wall) - (time.monotonic() - self._mono)
+        return abs(drift) > CLOCK_JUMP or utc_offset() != self._offset
+
+    def due(self):
+        return time.time() >= self._deadline or self.clock_jumped()
+
+
 def fmt_countdown(delta):
     s = max(0, int(delta.total_seconds()))
     if s == 0:
@@ -371,50 +419,245 @@ WEEKLY_TASKS = [
 # ╚════════════════════════════════════════════════════════════╝
 
 SAVE_DIR = Path(os.environ.get("APPDATA", ".")) / "NyankoProtocol"
-SAVE_FILE = SAVE_DIR / "checklist.json"
+SAVE_FILE = SAVE_DIR / "checklist.json"     # hot: checks, counters, marks, active build header
+BUILDS_FILE = SAVE_DIR / "builds.json"      # cold: active build details and the build library
+JOURNAL_FILE = SAVE_DIR / "checklist.journal"   # task actions since the checklist.json snapshot
+JOURNAL_COMPACT_BYTES = 64 * 1024   # fold the journal into a new snapshot past this size
+DB_FILE = SAVE_DIR / "checklist.db"     # NYANKO_STORAGE=sqlite: hot state plus full completion history
+STORAGE = os.environ.get("NYANKO_STORAGE", "json").strip().lower()
+
+# scrape_guide result / library record field -> saved key of the active build
+BUILD_FIELD_KEYS = {
+    "title": "build_guide_title", "gearing": "build_gearing", "planner_url": "build_planner_url",
+    "gear_slots": "build_gear_slots", "food": "build_food", "serum": "build_serum",
+}
+
+# Keys kept in BUILDS_FILE; only the Build tab reads them, so it is loaded on first use
+COLD_KEYS = ("build_gearing", "build_planner_url", "build_gear_slots", "builds")
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text("utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def _split_cold(data):
+    """
+    Move cold keys out of a save from before the hot/cold split into BUILDS_FILE (written
+    first, so a crash in between only leaves keys behind that the next load drops).
+    """
+    if not BUILDS_FILE.exists():
+        write_atomic(BUILDS_FILE, dump_json_compact({k: data[k] for k in COLD_KEYS if k in data}))
+    hot = {k: v for k, v in data.items() if k not in COLD_KEYS}
+    write_atomic(SAVE_FILE, dump_json(hot))
+    for k in COLD_KEYS:
+        data.pop(k, None)
+
+
+# Hot keys that only change through task/reset records; every other hot key is a setting
+STATE_KEYS = ("daily", "weekly", "daily_count", "weekly_count", "d_mark", "w_mark", "seq")
 
 
 def load_data():
+    """
+    Hot state only (see load_builds for the rest): the checklist.json snapshot plus every
+    journal record newer than it (or the SQLite store's current periods), then any
+    daily/weekly reset that is due. If the SQLite store can't be read the JSON save is shown
+    instead, but neither imported into it nor reset, so the database is left as it is.
+    """
+    global _snapshot_stat
     default = {
         "daily": [], "weekly": [], "d_mark": "", "w_mark": "",
-        "daily_count": {}, "weekly_count": {},
-        "build_guide_url": "", "build_guide_title": "", "build_gearing": "",
-        "build_planner_url": "", "build_gear_slots": [],
-        "build_food": "", "build_serum": "",
+        "daily_count": {}, "weekly_count": {}, "seq": 0,
+        "build_guide_url": "", "build_guide_title": "",
+        "build_food": "", "build_serum": "", "build_auto_refresh": False,
     }
-    if not SAVE_FILE.exists():
-        return default
+    with hot_lock:
+        data = store.load() if store is not None else None
+        unreadable = store is not None and not store.loaded
+        from_json = data is None
+        if from_json:
+            data = _read_json(SAVE_FILE) if SAVE_FILE.exists() else None
+            if not isinstance(data, dict):
+                data = {}
+            if any(k in data for k in COLD_KEYS):
+                try:
+                    _split_cold(data)
+                except OSError:
+                    pass    # keep running on the old file; the split is retried next load
+            _snapshot_stat = file_stat(SAVE_FILE)
+        for k in default:
+            if k not in data:
+                data[k] = default[k]
+        if not isinstance(data.get("daily_count"), dict):
+            data["daily_count"] = {}
+        if not isinstance(data.get("weekly_count"), dict):
+            data["weekly_count"] = {}
+        if from_json:
+            for record in journal.read():
+                if record.get("seq", 0) > data["seq"]:
+                    apply_action(data, record)
+            if store is not None and not unreadable:
+                store.save_state(data)  # first start on SQLite: import the JSON save
+        if not unreadable:
+            apply_resets(data)
+    return data
+
+
+def sync_data(data):
+    """
+    Pick up, in place, what other running instances wrote since we last looked: their
+    journal records are replayed onto data (so counter changes add up), while a new snapshot
+    (their compaction) or a changed SQLite database means a full reload. A stat or two when
+    nothing changed. Returns True if data changed. An unreadable SQLite store is retried
+    here; data is kept as it is until it can be read.
+    """
+    if store is not None:
+        if store.loaded and not store.changed():
+            return False
+        fresh = load_data()
+        if not store.loaded:
+            return False
+        data.clear()
+        data.update(fresh)
+        return True
+    if file_stat(SAVE_FILE) == _snapshot_stat:
+        records = journal.read_new()
+        if records is not None:
+            seq = data["seq"]
+            for record in records:
+                if record.get("seq", 0) > data["seq"]:
+                    apply_action(data, record)
+            return data["seq"] != seq
+    fresh = load_data()
+    data.clear()
+    data.update(fresh)
+    return True
+
+
+# ── Action journal ──
+# {"seq", "t", "op", "section", "task", "delta"}: op "check"/"count" for tasks, "reset" (+ "mark"),
+# and "set" (+ "values") for settings in section "settings"
+
+def apply_action(data, record):
+    """Apply one journal record to the hot save dict (live and on replay)."""
+    section = record["section"]
+    op = record["op"]
+    task = record.get("task")
+    if op == "check":
+        if record["delta"] > 0 and task not in data[section]:
+            data[section].append(task)
+        elif record["delta"] < 0 and task in data[section]:
+            data[section].remove(task)
+    elif op == "count":
+        counts = data[section + "_count"]
+        counts[task] = max(0, counts.get(task, 0) + record["delta"])
+    elif op == "reset":
+        data[section] = []
+        data[section + "_count"] = {}
+        data[section[0] + "_mark"] = record["mark"]
+    elif op == "set":
+        data.update(record["values"])
+    data["seq"] = record["seq"]
+
+
+def record_action(data, op, section, task=None, delta=0, **extra):
+    """
+    Apply an action to data and append it to the journal (O(1): no snapshot rewrite). Runs
+    under the instance lock, after catching up with other instances, so sequence numbers stay
+    unique and concurrent counter changes add up instead of overwriting each other.
+    """
+    with hot_lock:
+        sync_data(data)
+        record = {"seq": data["seq"] + 1, "t": round(time.time(), 3), "op": op,
+                  "section": section, "task": task, "delta": delta}
+        record.update(extra)
+        apply_action(data, record)
+        if store is not None:
+            store.record(record, data)
+            return
+        journal.append(record)
+        if journal.error is None and journal.size > JOURNAL_COMPACT_BYTES:
+            compact(data)
+
+
+def compact(data):
+    """Write data as the new snapshot (fsynced) and empty the journal; hot_lock must be held."""
+    global _snapshot_stat
     try:
-        data = json.loads(SAVE_FILE.read_text("utf-8"))
-    except (json.JSONDecodeError, OSError):
-        return default
-    for k in default:
-        if k not in data:
-            data[k] = default[k]
-    if not isinstance(data.get("daily_count"), dict):
-        data["daily_count"] = {}
-    if not isinstance(data.get("weekly_count"), dict):
-        data["weekly_count"] = {}
-
-    # Auto-reset if a reset boundary has been crossed
+        write_atomic(SAVE_FILE, dump_json(data))
+        _snapshot_stat = file_stat(SAVE_FILE)
+        journal.clear()
+    except OSError:
+        pass    # keep appending; compaction is retried with the next record
+
+
+def apply_resets(data):
+    """Reset daily/weekly progress if a boundary was crossed since data's marks; True if one was."""
+    changed = False
     d_mark = last_daily_reset().isoformat()
     w_mark = last_weekly_reset().isoformat()
-    if data.get("d_mark") != d_mark:
-        data["daily"] = []
-        data["daily_count"] = {}
-        data["d_mark"] = d_mark
-    if data.get("w_mark") != w_mark:
-        data["weekly"] = []
-        data["weekly_count"] = {}
-        data["w_mark"] = w_mark
-    return data
+    with hot_lock:
+        sync_data(data)     # another instance may have reset (and ticked tasks) already
+        if data.get("d_mark") != d_mark:
+            record_action(data, "reset", "daily", mark=d_mark)
+            changed = True
+        if data.get("w_mark") != w_mark:
+            record_action(data, "reset", "weekly", mark=w_mark)
+            changed = True
+    return changed
+
+
+def load_builds(data):
+    """Cold build data (gearing, planner, gear slots, library) for the hot save dict data."""
+    cold = {"build_gearing": "", "build_planner_url": "", "build_gear_slots": [], "builds": {}}
+    saved = _read_json(BUILDS_FILE) if BUILDS_FILE.exists() else None
+    if isinstance(saved, dict):
+        cold.update((k, saved[k]) for k in cold if k in saved)
+    if not isinstance(cold["builds"], dict):
+        cold["builds"] = {}
+    # Saves from before the build library: the single build becomes its first entry
+    if not cold["builds"] and data.get("build_guide_url"):
+        url = data["build_guide_url"]
+        merged = dict(data, **cold)
+        record = {field: merged.get(key) for field, key in BUILD_FIELD_KEYS.items()}
+        cold["builds"][build_id(url)] = build_record(url, record)
+    return cold
+
+
+# Every running instance takes hot_lock around hot writes; builds.json is written behind the
+# UI (debounced, on a background thread, atomically replaced) under its own lock
+hot_lock = FileLock(str(SAVE_DIR / "checklist.lock"))
+builds_saver = WriteBehindSaver(BUILDS_FILE, dump_json_compact, lock=FileLock(str(SAVE_DIR / "builds.lock")))
+journal = Journal(str(JOURNAL_FILE))
+store = SqliteStore(str(DB_FILE)) if STORAGE == "sqlite" and SqliteStore is not None else None
+_snapshot_stat = None   # file_stat of checklist.json when we last read or wrote it
 
 
 def save_data(data):
+    """Persist the settings part of data (build header, auto-refresh) as one "set" record."""
+    record_action(data, "set", "settings", values={k: v for k, v in data.items() if k not in STATE_KEYS})
+
+
+def save_error():
+    """Most recent failed write of any store (None when all are fine)."""
+    return journal.error or builds_saver.error or (store.error if store is not None else None)
+
+
+def reset_marks(section):
+    """Reset marks (period keys) of section, newest first: the current period, then back in time."""
+    mark = last_daily_reset() if section == "daily" else last_weekly_reset()
+    step = timedelta(days=1 if section == "daily" else 7)
+    while True:
+        yield mark.isoformat()
+        mark -= step
+
+
+def save_builds(cold):
     SAVE_DIR.mkdir(parents=True, exist_ok=True)
-    data["d_mark"] = last_daily_reset().isoformat()
-    data["w_mark"] = last_weekly_reset().isoformat()
-    SAVE_FILE.write_text(json.dumps(data, indent=2), "utf-8")
+    builds_saver.save(cold)
 
 
 # ╔════════════════════════════════════════════════════════════╗
@@ -453,10 +696,135 @@ def progress_bar(done, total, width=22):
     return f"  {bar} [{color}]{pct}%[/] [bright_cyan]{done}/{total}[/] ~nya!{sparkle}"
 
 
+# ╔════════════════════════════════════════════════════════════╗
+# ║  🔄  BUILD IMPORT & REFRESH                               ║
+# ╚════════════════════════════════════════════════════════════╝
+
+BUILD_REFRESH_INTERVAL = 60 * 60    # seconds between re-scrapes of the saved guide
+BUILD_REFRESH_FIRST = 20            # first check this long after startup
+
+
+def build_fields(result):
+    """Saved active-build fields for a scrape_guide result (or library record)."""
+    fields = {key: result.get(field) or "" for field, key in BUILD_FIELD_KEYS.items()}
+    fields["build_guide_title"] = fields["build_guide_title"] or "Build"
+    fields["build_gear_slots"] = fields["build_gear_slots"] or []
+    return fields
+
+
+class BuildRefresher:
+    """
+    Daemon thread that re-scrapes `url` every BUILD_REFRESH_INTERVAL and puts (url, result)
+    on `results`. scrape_guide re-validates its disk cache with If-None-Match/If-Modified-Since,
+    so an unchanged guide costs one 304. The UI thread sets `url` ("" pauses) and drains results.
+    """
+
+    def __init__(self, interval=BUILD_REFRESH_INTERVAL, first=BUILD_REFRESH_FIRST):
+        self.url = ""
+        self.interval = interval
+        self.first = first
+        self.results = queue.Queue()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="build-refresh", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Check now instead of waiting out the interval."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        delay = self.first
+        while not self._stop.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            delay = self.interval
+            url = self.url
+            if not url:
+                continue
+            try:
+                result = scrape_guide(url)
+            except Exception:
+                continue
+            if not result.get("error"):
+                self.results.put((url, result))
+
+
+# Status shown after each scrape_guide stage finishes (what it is doing next)
+IMPORT_STATUS = {
+    "fetch_guide": "Parsing guide", "parse_memo": "Parsing guide", "strip": "Parsing guide",
+    "sections": "Parsing guide", "gear": "Parsing guide", "planner_id": "Fetching planner",
+    "planner_fetch": "Finishing",
+}
+
+
+class ImportCancelled(BaseException):
+    """Raised from BuildImport's stage hook; a BaseException so scrape_guide's error handling lets it through."""
+
+
+class BuildImport:
+    """
+    One build import on a daemon thread. The UI thread reads `status` each frame and picks up
+    `result` once `done` is set; cancel() makes the worker stop at the next stage boundary
+    and drop whatever it fetched. offline re-extracts the archived copy instead of fetching.
+    """
+
+    def __init__(self, url, offline=False):
+        self.url = url
+        self.offline = offline
+        self.status = "Re-extracting" if offline else "Fetching guide"
+        self.started = time.time()
+        self.result = None
+        self.done = threading.Event()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="build-import", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def _on_stage(self, name, record):
+        if self._cancel.is_set():
+            raise ImportCancelled()
+        self.status = IMPORT_STATUS.get(name, self.status)
+
+    def _run(self):
+        try:
+            if self.offline:
+                self.result = reextract_guide(self.url)
+            else:
+                self.result = scrape_guide(self.url, timings=True, on_stage=self._on_stage)
+        except ImportCancelled:
+            pass
+        except Exception as e:
+            self.result = {"error": str(e)}
+        finally:
+            self.done.set()
+
+
 # ╔════════════════════════════════════════════════════════════╗
 # ║  🐾  MAIN APPLICATION                                     ║
 # ╚════════════════════════════════════════════════════════════╝
 
+HISTORY_WEEKS = 13      # "missed weeklies" look-back with NYANKO_STORAGE=sqlite (about 3 months)
+BUILD_LIST_ROWS = 8     # library rows shown on the Build tab (the list scrolls with the cursor)
+BUILD_DIFF_SLOTS = 8    # changed slots listed in a diff before "… N more"
+
+
 class NyankoApp:
     def __init__(self):
         self.data = load_data()
@@ -468,7 +836,82 @@ class NyankoApp:
         self.flash_time = 0.0
         self.quote = random.choice(CAT_QUOTES)
         self.neko_face = random.choice(NEKO_FACES)
-        self.last_save_check = time.time()
+        self.refresher = BuildRefresher() if scrape_guide is not None else None
+        self.input_mode = None  # "import_url" / "search" while a prompt is open
+        self.input_buf = ""
+        self._cold = None       # load_builds() result, read on first use (Build tab, import)
+        self._cold_stat = None  # file_stat of BUILDS_FILE when it was read
+        self._library = None
+        self.build_query = ""
+        self.build_matches = []
+        self.build_compare = False  # Build tab: diff the cursor build against the active one
+        self.build_scores = {}      # library id -> score under the active guide's priority
+        self.piece_scores = {}      # active build: slot -> score
+        self.importing = None   # running BuildImport
+        self.resets = ResetScheduler()
+        self._history = (None, "")  # (key, note) of the last history lookup
+        if store is not None:
+            store.sync_tasks("daily", DAILY_TASKS)
+            store.sync_tasks("weekly", WEEKLY_TASKS)
+
+    # ── Build data (cold store) ──────────────────────────────
+
+    def _load_cold(self):
+        """Active build details and library records from BUILDS_FILE, loaded on first access."""
+        if self._cold is None:
+            self._cold_stat = file_stat(BUILDS_FILE)
+            self._cold = load_builds(self.data)
+            self._library = BuildLibrary(self._cold["builds"])
+            self._library_changed()
+        return self._cold
+
+    cold = property(_load_cold)
+
+    @property
+    def library(self):
+        self._load_cold()
+        return self._library
+
+    def build_value(self, key):
+        """Saved active-build field, from whichever store holds it."""
+        return (self.cold if key in COLD_KEYS else self.data).get(key)
+
+    def _set_build_fields(self, fields):
+        for k, v in fields.items():
+            (self.cold if k in COLD_KEYS else self.data)[k] = v
+
+    def _save(self, builds=False):
+        """Queue the hot save (and the cold one when builds changed)."""
+        save_data(self.data)
+        if builds:
+            save_builds(self.cold)
+
+    def _drop_cold(self):
+        """Forget the cold store; it is read again on next use."""
+        self._cold = None
+        self._library = None
+        self.build_matches = []
+        self.build_scores = {}
+        self.piece_scores = {}
+
+    def reload(self):
+        """Re-read both stores from disk (the cold one lazily, on next use)."""
+        builds_saver.flush()
+        self.data = load_data()
+        self._drop_cold()
+
+    def sync(self):
+        """
+        Each frame: apply what other instances saved. Hot state catches up through
+        sync_data; a builds.json we didn't write is re-read lazily unless our own unsaved
+        build changes are about to replace it anyway.
+        """
+        if sync_data(self.data):
+            self.cursor = min(self.cursor, max(0, self.row_count() - 1))
+        if self._cold is not None and not builds_saver.pending:
+            st = file_stat(BUILDS_FILE)
+            if st != self._cold_stat and st != builds_saver.stat:
+                self._drop_cold()
 
     # ── Task accessors ───────────────────────────────────────
 
@@ -483,6 +926,13 @@ class NyankoApp:
             return list(WEEKLY_TASKS)
         return []   # Build Summary has no task list
 
+    def row_count(self):
+        """Rows the cursor can move over (tasks, or matching library builds on the Build tab)."""
+        if self.section == 2:
+            self._load_cold()
+            return len(self.build_matches)
+        return len(self.tasks())
+
     def checked(self):
         return self.data["daily"] if self.section == 0 else self.data["weekly"]
 
@@ -495,35 +945,33 @@ class NyankoApp:
     # ── Actions ──────────────────────────────────────────────
 
     def toggle(self):
+        sync_data(self.data)    # the counter cap check below needs other instances' runs too
         ts = self.tasks()
         if not ts or self.cursor >= len(ts):
             return
         task = ts[self.cursor]
         tid = task["id"]
         key = "daily" if self.section == 0 else "weekly"
-        count_key = "daily_count" if self.section == 0 else "weekly_count"
-        counts = self.data[count_key]
+        counts = self.counts()
 
         if self.is_counter_task(task):
             cap = task["counter"]
             cur = counts.get(tid, 0)
             if cur < cap:
-                counts[tid] = cur + 1
+                record_action(self.data, "count", key, tid, 1)
                 self.flash = random.choice(CHECK_MSGS) + " " + self.neko_face
             else:
                 self.flash = "Already at cap, nya~ " + self.neko_face
             self.flash_time = time.time()
-            save_data(self.data)
             return
 
         if tid in self.data[key]:
-            self.data[key].remove(tid)
+            record_action(self.data, "check", key, tid, -1)
             self.flash = random.choice(UNCHECK_MSGS) + " " + self.neko_face
         else:
-            self.data[key].append(tid)
+            record_action(self.data, "check", key, tid, 1)
             self.flash = random.choice(CHECK_MSGS) + " " + self.neko_face
         self.flash_time = time.time()
-        save_data(self.data)
 
     def counter_decrement(self):
         ts = self.tasks()
@@ -533,14 +981,10 @@ class NyankoApp:
         if not self.is_counter_task(task):
             return
         tid = task["id"]
-        count_key = "daily_count" if self.section == 0 else "weekly_count"
-        counts = self.data[count_key]
-        cur = counts.get(tid, 0)
-        if cur > 0:
-            counts[tid] = cur - 1
+        if self.counts().get(tid, 0) > 0:
+            record_action(self.data, "count", "daily" if self.section == 0 else "weekly", tid, -1)
             self.flash = "Removed one, nya~ " + self.neko_face
             self.flash_time = time.time()
-            save_data(self.data)
 
     def switch_section(self):
         self.section = (self.section + 1) % 3
@@ -549,48 +993,239 @@ class NyankoApp:
         self.quote = random.choice(CAT_QUOTES)
 
     def _do_import_build(self):
-        """Prompt for Maxroll URL, scrape Gearing + Food/Serum, save and show flash."""
+        """Open the URL prompt; the import itself runs on a BuildImport worker."""
         if scrape_guide is None:
             self.flash = "Import not available (maxroll_scraper missing), nya~"
             self.flash_time = time.time()
             return
-        sys.stdout.write("\033[?25h")  # show cursor
-        console.print()
-        console.print("  [bold bright_yellow]Import Maxroll build guide[/]")
-        console.print("  Paste URL (e.g. https://maxroll.gg/blue-protocol/build-guides/...):")
-        try:
-            url = input("  > ").strip()
-        except (EOFError, KeyboardInterrupt):
-            url = ""
-        sys.stdout.write("\033[?25l")  # hide cursor again
-        if not url:
-            self.flash = "No URL entered, nya~"
-            self.flash_time = time.time()
+        if self.importing is not None:
             return
-        console.print("  [dim]Fetching guide...[/]")
-        result = scrape_guide(url)
+        self.input_mode = "import_url"
+        self.input_buf = ""
+
+    def _input_key(self, key):
+        """Keystroke while a prompt is open (Enter starts the import, Esc closes it)."""
+        if self.input_mode == "search":
+            self._search_key(key)
+        elif key == b'\x1b':
+            self.input_mode = None
+        elif key == b'\r':
+            url = self.input_buf.strip()
+            self.input_mode = None
+            if not url:
+                self.flash = "No URL entered, nya~"
+                self.flash_time = time.time()
+                return
+            self.importing = BuildImport(url)
+        elif key == b'\x08':
+            self.input_buf = self.input_buf[:-1]
+        elif key == b'\x16':           # Ctrl+V is pasted as text by the console; ignore the raw key
+            pass
+        elif key >= b' ':
+            self.input_buf += key.decode("latin-1")
+
+    def _search_key(self, key):
+        """Build tab search: the filter is re-run on every keystroke; Enter keeps it, Esc clears it."""
+        if key == b'\r':
+            self.input_mode = None
+            return
+        if key == b'\x1b':
+            self.input_mode = None
+            self.build_query = ""
+        elif key == b'\x08':
+            self.build_query = self.build_query[:-1]
+        elif key >= b' ':
+            self.build_query += key.decode("latin-1")
+        else:
+            return
+        self.cursor = 0
+        self._refresh_matches()
+
+    def _poll_import(self):
+        """Apply a finished import or re-extract in one step (UI thread)."""
+        job = self.importing
+        if job is None or not job.done.is_set():
+            return
+        self.importing = None
+        if job.cancelled:
+            return
+        result = job.result or {}
         if result.get("error"):
-            self.flash = f"Import failed: {result['error']} ~nya"
+            self.flash = f"{'Re-extract' if job.offline else 'Import'} failed: {escape(str(result['error']))} ~nya"
             self.flash_time = time.time()
             return
-        self.data["build_guide_url"] = url
-        self.data["build_guide_title"] = result.get("title") or "Build"
-        self.data["build_gearing"] = result.get("gearing") or ""
-        self.data["build_planner_url"] = result.get("planner_url") or ""
-        self.data["build_gear_slots"] = result.get("gear_slots") or []
-        self.data["build_food"] = result.get("food") or ""
-        self.data["build_serum"] = result.get("serum") or ""
-        save_data(self.data)
-        self.flash = f"Build imported: {self.data['build_guide_title']} ~nya!"
+        self._set_active_build(job.url, result, imported=not job.offline)
+        self._save(builds=True)
+        if job.offline:
+            self.flash = f"Build re-extracted offline: {escape(self.data['build_guide_title'])} ~nya!"
+        else:
+            self.flash = f"Build imported: {escape(self.data['build_guide_title'])} ~nya!"
+        if result.get("planner_error"):
+            self.flash += f"  [dim](gear planner unavailable: {escape(str(result['planner_error']))})[/]"
+        if result.get("timings"):
+            self.flash += f"  [dim]({format_timings(result['timings'])})[/]"
+        self.flash_time = time.time()
+
+    def cancel_import(self):
+        if self.importing is not None:
+            self.importing.cancel()
+            self.importing = None
+            self.flash = "Import cancelled, nya~"
+            self.flash_time = time.time()
+
+    def _set_active_build(self, url, result, imported=False):
+        """
+        Make result the active build (one dict update) and store it in the library; the
+        index only re-tokenizes this build. imported moves it to the top of the library.
+        If the planner page could not be read the saved gear is kept, not wiped.
+        """
+        existing = self.library.get(build_id(url))
+        if existing and not imported:
+            result = dict(result, imported_at=existing.get("imported_at"))
+        if existing and result.get("planner_error") and not result.get("gear_slots"):
+            result = dict(result, gear_slots=existing.get("gear_slots") or [])
+        fields = build_fields(result)
+        fields["build_guide_url"] = url
+        self._set_build_fields(fields)
+        self.library.put(url, result)
+        self._library_changed()
+
+    def _refresh_matches(self):
+        self.build_matches = self.library.search(self.build_query)
+        if self.section == 2:
+            self.cursor = min(self.cursor, max(0, len(self.build_matches) - 1))
+
+    def _library_changed(self):
+        """After an import, delete or reload: re-filter and re-score (searching only re-filters)."""
+        self._refresh_matches()
+        self._refresh_scores()
+
+    def _refresh_scores(self):
+        """Score every library build's gear against the active guide's attribute priority."""
+        weights = priority_weights(self.cold.get("build_gearing"))
+        ids = list(self.library.builds)
+        if not weights or not ids:
+            self.build_scores = {}
+            self.piece_scores = {}
+            return
+        models = [self.library.model(bid) for bid in ids]
+        build_scores, piece_scores = score_builds(models, weights)
+        self.build_scores = dict(zip(ids, build_scores))
+        active = build_id(self.data.get("build_guide_url"))
+        self.piece_scores = {}
+        if active in self.library.builds:
+            i = ids.index(active)
+            self.piece_scores = dict(zip(models[i].gear, piece_scores[i]))
+
+    def activate_build(self):
+        """Make the library build under the cursor the active one."""
+        if not self.build_matches or self.cursor >= len(self.build_matches):
+            return
+        record = self.library.get(self.build_matches[self.cursor])
+        self._set_active_build(record["url"], record)
+        self._save(builds=True)
+        self.flash = f"Active build: {escape(self.data['build_guide_title'])} ~nya!"
         self.flash_time = time.time()
 
+    def delete_build(self):
+        """Remove the library build under the cursor (clears the active build if it was that one)."""
+        if not self.build_matches or self.cursor >= len(self.build_matches):
+            return
+        bid = self.build_matches[self.cursor]
+        title = self.library.get(bid).get("title") or "Build"
+        self.library.delete(bid)
+        if build_id(self.data.get("build_guide_url")) == bid:
+            self._set_build_fields(dict(build_fields({}), build_guide_url="", build_guide_title=""))
+        self._library_changed()
+        self._save(builds=True)
+        self.flash = f"Deleted {escape(title)}, nya~"
+        self.flash_time = time.time()
+
+    def history_note(self):
+        """Streak of the task under the cursor (and missed weeklies) from the SQLite history."""
+        ts = self.tasks()
+        if store is None or not store.loaded or not ts or self.cursor >= len(ts):
+            return ""
+        task = ts[self.cursor]
+        section = "daily" if self.section == 0 else "weekly"
+        key = (section, task["id"], self.data["seq"], self.data["d_mark"])
+        if self._history[0] == key:
+            return self._history[1]
+        marks = reset_marks(section)
+        if task.get("days"):
+            marks = (m for m in marks if datetime.fromisoformat(m).weekday() in task["days"])
+        n = store.streak(section, task["id"], task.get("counter"), marks)
+        unit = ("day" if section == "daily" else "week") + ("" if n == 1 else "s")
+        note = f"{task['name']}: {n} {unit} streak"
+        if section == "weekly":
+            past = list(itertools.islice(reset_marks("weekly"), 1, HISTORY_WEEKS + 1))
+            missed = store.missed("weekly", past)
+            note += f"  |  missed {len(missed)} weeklies in the last {HISTORY_WEEKS} weeks"
+        self._history = (key, note)
+        return note
+
+    def check_resets(self):
+        """Reset boundary passed or clock jumped: reset (journaled) if needed, then reschedule."""
+        if apply_resets(self.data):
+            self.flash = "Reset happened! Fresh start, nya~!"
+            self.flash_time = time.time()
+            self.quote = random.choice(CAT_QUOTES)
+        self.resets.recompute()
+
+    def toggle_auto_refresh(self):
+        if self.refresher is None:
+            self.flash = "Auto-refresh not available (maxroll_scraper missing), nya~"
+        else:
+            self.data["build_auto_refresh"] = not self.data.get("build_auto_refresh")
+            save_data(self.data)
+            if self.data["build_auto_refresh"]:
+                self.refresher.url = self.data.get("build_guide_url", "")
+                self.refresher.wake()
+            self.flash = "Build auto-refresh " + ("on" if self.data["build_auto_refresh"] else "off") + ", nya~"
+        self.flash_time = time.time()
+
+    def _apply_refresh_results(self):
+        """Apply finished background refreshes (UI thread); saves only when the guide changed."""
+        if self.refresher is None:
+            return
+        self.refresher.url = self.data.get("build_guide_url", "") if self.data.get("build_auto_refresh") else ""
+        while True:
+            try:
+                url, result = self.refresher.results.get_nowait()
+            except queue.Empty:
+                return
+            if url != self.data.get("build_guide_url"):
+                continue    # a different build was imported meanwhile
+            if result.get("planner_error") and not result.get("gear_slots"):
+                result = dict(result, gear_slots=self.build_value("build_gear_slots") or [])
+            fields = build_fields(result)
+            if all(self.build_value(k) == v for k, v in fields.items()):
+                continue
+            self._set_active_build(url, result)
+            self._save(builds=True)
+            diff = self.library.previous_diff(build_id(url))
+            self.flash = f"Build updated from Maxroll: {escape(self.data['build_guide_title'])} ~nya!"
+            if diff:
+                self.flash += f"  [dim]({diff.summary()}, see Build tab)[/]"
+            self.flash_time = time.time()
+
+    def _do_reextract_build(self):
+        """Re-run the extractors over the archived copy of the saved guide on a BuildImport worker."""
+        url = self.data.get("build_guide_url") or ""
+        if reextract_guide is None or not url:
+            self.flash = "Nothing to re-extract, import a build first, nya~"
+            self.flash_time = time.time()
+            return
+        if self.importing is None:
+            self.importing = BuildImport(url, offline=True)
+
     def _render_build_summary(self, out):
         """Render Build Summary panel (Gearing + Food/Serum at a glance)."""
         title = self.data.get("build_guide_title") or "No build imported"
         url = self.data.get("build_guide_url") or ""
-        planner_url = self.data.get("build_planner_url") or ""
-        gearing = self.data.get("build_gearing") or ""
-        gear_slots = self.data.get("build_gear_slots") or []
+        planner_url = self.cold.get("build_planner_url") or ""
+        gearing = self.cold.get("build_gearing") or ""
+        gear_slots = self.cold.get("build_gear_slots") or []
         food = self.data.get("build_food") or "—"
         serum = self.data.get("build_serum") or "—"
 
@@ -622,11 +1257,15 @@ class NyankoApp:
         if gear_slots:
             gear_lines = []
             for g in gear_slots[:14]:
-                slot = g.get("slot") or "?"
-                name = g.get("name") or "—"
-                basic = g.get("basic_attributes") or ""
-                advanced = g.get("advanced_attributes") or ""
-                gear_lines.append(f"  [bold]{slot}:[/] [bright_cyan]{name}[/]")
+                piece = GearPiece.from_dict(g)
+                slot = piece.slot
+                name = piece.name or "—"
+                # Parsed "stat value" pairs; text they don't fully cover is shown as-is
+                basic = format_attribute_text(g.get("basic_attributes"))
+                advanced = format_attribute_text(g.get("advanced_attributes"))
+                score = self.piece_scores.get(slot)
+                score_text = f"  [dim]score[/] [bright_yellow]{score:.2f}[/]" if score is not None else ""
+                gear_lines.append(f"  [bold]{slot}:[/] [bright_cyan]{name}[/]{score_text}")
                 if basic:
                     gear_lines.append(f"    [dim]Basic:[/] {basic[:70]}{'…' if len(basic) > 70 else ''}")
                 if advanced:
@@ -635,13 +1274,24 @@ class NyankoApp:
         elif not planner_url:
             gear_block += "\n[dim]Gear: Open the guide in a browser; hover items for tooltips or use the planner if linked.[/]"
 
+        score = self.build_scores.get(build_id(url))
+        if score is not None:
+            better = sum(1 for v in self.build_scores.values() if v > score)
+            score_line = (
+                f"[bold]Gear score[/] vs attribute priority: [bright_yellow]{score:.2f}[/] "
+                f"[dim](#{better + 1} of {len(self.build_scores)} in library)[/]\n"
+            )
+        else:
+            score_line = ""
         body = (
             f"[bold bright_cyan]{title}[/]\n"
             f"[dim]{url}[/]\n\n"
+            f"{score_line}"
             f"{gearing_block}\n"
             f"{gear_block}\n\n"
             f"  [bold]Food:[/]  [bright_yellow]{food}[/]\n"
-            f"  [bold]Serum:[/] [bright_yellow]{serum}[/]"
+            f"  [bold]Serum:[/] [bright_yellow]{serum}[/]\n\n"
+            f"  [dim]Auto-refresh: {'on' if self.data.get('build_auto_refresh') else 'off'} (A)[/]"
         )
         out.print(
             Panel(
@@ -653,6 +1303,106 @@ class NyankoApp:
             )
         )
 
+    def _render_build_diff(self, out, heading, diff):
+        """Changed fields and slots of a BuildDiff, one line per stat."""
+        lines = [f"[bold]{heading}[/] [dim]({diff.summary()})[/]"]
+        for field, old, new in diff.fields:
+            if field == "gearing":
+                lines.append("  [bold]Gearing[/] changed")
+            else:
+                lines.append(f"  [bold]{field.title()}:[/] [red]{escape(old or '—')}[/] → [bright_green]{escape(new or '—')}[/]")
+        for change in diff.slots[:BUILD_DIFF_SLOTS]:
+            if change.kind == "added":
+                lines.append(f"  [bright_green]+ {change.slot}: {escape(change.new.name)}[/]")
+            elif change.kind == "removed":
+                lines.append(f"  [red]- {change.slot}: {escape(change.old.name)}[/]")
+            else:
+                name = escape(change.new.name)
+                if change.old.name != change.new.name:
+                    name = f"[red]{escape(change.old.name)}[/] → [bright_green]{name}[/]"
+                lines.append(f"  [bold]{change.slot}:[/] {name}")
+                for stat, old, new in change.stats:
+                    if old is None:
+                        lines.append(f"      [bright_green]+ {format_stat(stat, new)}[/]")
+                    elif new is None:
+                        lines.append(f"      [red]- {format_stat(stat, old)}[/]")
+                    else:
+                        color = "bright_green" if new > old else "red"
+                        lines.append(
+                            f"      {format_stat(stat, old)} → [{color}]{format_value(new)} "
+                            f"({'+' if new > old else ''}{format_value(new - old)})[/]"
+                        )
+        if len(diff.slots) > BUILD_DIFF_SLOTS:
+            lines.append(f"  [dim]… {len(diff.slots) - BUILD_DIFF_SLOTS} more slots[/]")
+        out.print("\n".join("  " + line for line in lines))
+
+    def _render_build_changes(self, out):
+        """Compare mode: cursor build vs active build; otherwise what the last guide update changed."""
+        active = build_id(self.data.get("build_guide_url"))
+        if self.build_compare and self.build_matches and self.cursor < len(self.build_matches):
+            other = self.build_matches[self.cursor]
+            if other != active:
+                diff = self.library.diff(active, other)
+                if diff is not None:
+                    title = self.library.get(other).get("title") or "Build"
+                    self._render_build_diff(out, f"Active → {escape(title)}", diff)
+                    out.print()
+                return
+        diff = self.library.previous_diff(active) if active else None
+        if diff:
+            self._render_build_diff(out, "Changed in last guide update", diff)
+            out.print()
+
+    def _render_build_library(self, out):
+        """Library list under the summary: search line, then the matching builds."""
+        active = build_id(self.data.get("build_guide_url"))
+        if self.input_mode == "search":
+            query = f"[bright_cyan]{escape(self.build_query)}[/][blink]_[/]"
+        else:
+            query = f"[bright_cyan]{escape(self.build_query)}[/]" if self.build_query else "[dim]press / to search[/]"
+        out.print(
+            f"  [bold]Library[/] [dim]({len(self.build_matches)}/{len(self.library)} builds)[/]  "
+            f"[dim]Search:[/] {query}"
+        )
+        if not self.build_matches:
+            out.print("  [dim]  No builds match, nya~[/]" if self.build_query else "")
+            return
+        table = Table(box=box.SIMPLE, show_header=False, padding=(0, 1), expand=True)
+        table.add_column("", width=2, justify="center")
+        table.add_column("", width=2, justify="center")
+        table.add_column("Build", min_width=28)
+        table.add_column("Food / Serum", min_width=24)
+        table.add_column("Score", width=6, justify="right")
+        start = max(0, self.cursor - BUILD_LIST_ROWS + 1)
+        for i, bid in enumerate(self.build_matches[start:start + BUILD_LIST_ROWS], start):
+            record = self.library.get(bid)
+            here = i == self.cursor
+            table.add_row(
+                "[bold bright_yellow]►[/]" if here else "",
+                "[bright_green]★[/]" if bid == active else "",
+                escape(record.get("title") or "Build"),
+                f"[dim]{escape(record.get('food') or '—')} / {escape(record.get('serum') or '—')}[/]",
+                f"{self.build_scores[bid]:.2f}" if bid in self.build_scores else "",
+                style="bold on grey15" if here else "",
+            )
+        out.print(table)
+
+    def _render_status(self, out):
+        """URL prompt, import progress, flash message or quote (one slot under the content)."""
+        if self.input_mode == "import_url":
+            out.print("  [bold bright_yellow]Import Maxroll build guide[/] [dim](Enter to fetch, Esc to cancel)[/]")
+            out.print(f"  > [bright_cyan]{escape(self.input_buf)}[/][blink]_[/]")
+        elif self.importing is not None:
+            elapsed = time.time() - self.importing.started
+            out.print(
+                f"  [bold bright_yellow]  {self.importing.status}...[/] "
+                f"[dim]{elapsed:.0f}s  (Esc to cancel)[/]"
+            )
+        elif self.flash and time.time() - self.flash_time < 2.5:
+            out.print(f"  [bold bright_green]  {self.flash}[/]")
+        else:
+            out.print(f"  [italic dim]  \" {self.quote} \"[/]")
+
     # ── Rendering ────────────────────────────────────────────
 
     def render(self):
@@ -678,7 +1428,7 @@ class NyankoApp:
         w_cd = next_weekly_reset() - now
 
         ts = self.tasks()
-        self.cursor = min(self.cursor, max(0, len(ts) - 1))
+        self.cursor = min(self.cursor, max(0, self.row_count() - 1))
         chk = self.checked()
         counts = self.counts()
 
@@ -754,10 +1504,17 @@ class NyankoApp:
         # ── Build Summary section (section 2) ──
         if self.section == 2:
             self._render_build_summary(out)
+            self._render_build_changes(out)
+            self._render_build_library(out)
+            self._render_status(out)
             out.print()
             out.print(
                 f"  [dim][[/][bright_yellow]Tab[/][dim]] Back to tasks  "
                 f"[[/][bright_yellow]I[/][dim]] Import guide  "
+                f"[[/][bright_yellow]/[/][dim]] Search  "
+                f"[[/][bright_yellow]Enter[/][dim]] Use build  "
+                f"[[/][bright_yellow]Del[/][dim]] Delete  "
+                f"[[/][bright_yellow]D[/][dim]] {'Hide diff' if self.build_compare else 'Diff vs active'}  "
                 f"[[/][bright_yellow]Q[/][dim]] Quit[/]"
             )
             frame = buf.getvalue()
@@ -834,10 +1591,11 @@ class NyankoApp:
 
         # ── Flash message or quote ──
         out.print()
-        if self.flash and time.time() - self.flash_time < 2.5:
-            out.print(f"  [bold bright_green]  {self.flash}[/]")
-        else:
-            out.print(f"  [italic dim]  \" {self.quote} \"[/]")
+        self._render_status(out)
+
+        note = self.history_note()
+        if note:
+            out.print(f"  [dim]🔥 {note}[/]")
 
         # ── Conditional task note ──
         if self.section == 0:
@@ -857,6 +1615,7 @@ class NyankoApp:
             f"[[/][bright_yellow]Backspace[/][dim]] -1 (counts)  "
             f"[[/][bright_yellow]Tab[/][dim]] Switch  "
             f"[[/][bright_yellow]I[/][dim]] Import  "
+            f"[[/][bright_yellow]E[/][dim]] Re-extract  "
             f"[[/][bright_yellow]T[/][dim]] {tip_key}  "
             f"[[/][bright_yellow]Q[/][dim]] Quit[/]"
         )
@@ -877,22 +1636,50 @@ class NyankoApp:
 
         key = msvcrt.getch()
 
+        if self.input_mode is not None:
+            # Drain everything typed/pasted so far before the next frame
+            while True:
+                if key in (b'\xe0', b'\x00'):
+                    msvcrt.getch()  # arrows etc. do nothing in the prompt
+                else:
+                    self._input_key(key)
+                if self.input_mode is None or not msvcrt.kbhit():
+                    return
+                key = msvcrt.getch()
+
+        if key == b'\x1b':              # Esc cancels a running import, else clears the search
+            if self.importing is not None:
+                self.cancel_import()
+            elif self.section == 2 and self.build_query:
+                self.build_query = ""
+                self._refresh_matches()
+            return
+
         # Extended keys (arrows)
         if key in (b'\xe0', b'\x00'):
             key2 = msvcrt.getch()
             if key2 == b'H':      # Up
                 self.cursor = max(0, self.cursor - 1)
             elif key2 == b'P':    # Down
-                self.cursor = min(len(self.tasks()) - 1, self.cursor + 1)
+                self.cursor = max(0, min(self.row_count() - 1, self.cursor + 1))
             elif key2 == b'G':    # Home
                 self.cursor = 0
             elif key2 == b'O':    # End
-                self.cursor = max(0, len(self.tasks()) - 1)
+                self.cursor = max(0, self.row_count() - 1)
+            elif key2 == b'S' and self.section == 2:    # Delete
+                self.delete_build()
             return
 
         # Regular keys
         if key in (b' ', b'\r'):        # Space or Enter
-            self.toggle()
+            if self.section == 2:
+                self.activate_build()
+            else:
+                self.toggle()
+        elif key == b'/' and self.section == 2:     # Search the build library
+            self.input_mode = "search"
+        elif key in (b'd', b'D') and self.section == 2:     # Diff cursor build vs active
+            self.build_compare = not self.build_compare
         elif key == b'\x08':            # Backspace (decrement counter)
             self.counter_decrement()
         elif key == b'\t':              # Tab
@@ -903,8 +1690,12 @@ class NyankoApp:
             self.show_tips = not self.show_tips
         elif key in (b'i', b'I'):       # Import Maxroll build
             self._do_import_build()
+        elif key in (b'e', b'E'):       # Re-extract build from archived snapshot
+            self._do_reextract_build()
+        elif key in (b'a', b'A'):       # Toggle background build refresh
+            self.toggle_auto_refresh()
         elif key in (b'r', b'R'):       # Refresh
-            self.data = load_data()
+            self.reload()
             self.flash = "Refreshed! ~nya"
             self.flash_time = time.time()
 
@@ -912,31 +1703,43 @@ class NyankoApp:
 
     def run(self):
         sys.stdout.write("\033[?25l")   # hide cursor
+        if self.refresher is not None:
+            self.refresher.start()
         try:
             while self.running:
-                # Periodic reset check
-                if time.time() - self.last_save_check > 30:
-                    old_daily = list(self.data["daily"])
-                    old_weekly = list(self.data["weekly"])
-                    self.data = load_data()
-                    if self.data["daily"] != old_daily or self.data["weekly"] != old_weekly:
-                        self.flash = "Reset happened! Fresh start, nya~!"
-                        self.flash_time = time.time()
-                        self.quote = random.choice(CAT_QUOTES)
-                    self.last_save_check = time.time()
-
+                if self.resets.due():
+                    self.check_resets()
+                self.sync()
+
+                self._apply_refresh_results()
+                self._poll_import()
+                error = save_error()
+                if error is not None:
+                    self.flash = f"Save failed ({escape(str(error))}), retrying, nya~"
+                    self.flash_time = time.time()
                 self.render()
 
-                # Poll for input, re-render every ~1 second for timer
+                # Poll for input, re-render every ~1 second for timer (faster while importing)
+                frame = 0.25 if (self.importing is not None or self.input_mode) else 1.0
                 t0 = time.time()
-                while time.time() - t0 < 1.0:
+                while time.time() - t0 < frame:
                     if msvcrt.kbhit():
                         self.handle_input()
                         break
+                    if self.importing is not None and self.importing.done.is_set():
+                        break
+                    if self.resets.due():
+                        break
                     time.sleep(0.05)
         except KeyboardInterrupt:
             pass
         finally:
+            builds_saver.close()
+            journal.close()
+            if store is not None:
+                store.close()
+            if self.refresher is not None:
+                self.refresher.stop()
             sys.stdout.write("\033[?25h")   # show cursor
             console.clear()
             bye_cat = random.choice(list(CAT_ART.values()))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Gear scoring for Nyanko Protocol: weights from a guide's attribute priority
+("Attributes: 1. Intellect  2. Luck ...", "Legendary priority: ..."), applied to the
+parsed (stat, value) attributes of gear pieces in one batch.
+Uses NumPy when installed, plain Python otherwise (same results).
+"""
+
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# "1. Intellect  2. Luck" -> ["Intellect", "Luck"]
+PRIORITY_ITEM_RE = re.compile(r"\d+\.\s*([^\d\n]+?)\s*(?=\d+\.|$)", re.MULTILINE)
+LEGENDARY_WEIGHT = 0.5      # legendary priority counts half as much as main attributes
+
+# Other spellings of a stat; after these, stat names must match exactly ("Crit DMG" is not "Crit")
+STAT_ALIASES = {
+    "crit": "critical", "critrate": "critical", "criticalrate": "critical", "vers": "versatility",
+    "matk": "magicattack", "magicatk": "magicattack", "patk": "physicalattack", "physicalatk": "physicalattack",
+    "atk": "attack", "int": "intellect", "str": "strength", "agi": "agility",
+    "atkspd": "attackspeed", "attackspd": "attackspeed", "castspd": "castspeed",
+    "critdmg": "criticaldamage", "critdamage": "criticaldamage", "criticaldmg": "criticaldamage",
+}
+
+
+def stat_key(stat):
+    """Comparable stat name: lowercase letters only, aliases resolved ("Crit Rate %" -> "critical")."""
+    key = re.sub(r"[^a-z]", "", stat.lower())
+    return STAT_ALIASES.get(key, key)
+
+
+def priority_weights(gearing):
+    """
+    stat_key -> weight from a scrape_guide gearing string: with n attributes listed,
+    the first gets n, the last 1; legendary priority adds LEGENDARY_WEIGHT times the same.
+    """
+    weights = {}
+    for line in (gearing or "").splitlines():
+        label, _, rest = line.partition(":")
+        label = label.strip().lower()
+        if label == "attributes":
+            scale = 1.0
+        elif label == "legendary priority":
+            scale = LEGENDARY_WEIGHT
+        else:
+            continue
+        names = [m.group(1) for m in PRIORITY_ITEM_RE.finditer(rest)]
+        for rank, name in enumerate(names):
+            key = stat_key(name)
+            if key:
+                weights[key] = weights.get(key, 0.0) + scale * (len(names) - rank)
+    return weights
+
+
+def _column(weights, stat, cache):
+    """Index of the weighted stat a parsed stat name counts towards (None if unweighted)."""
+    if stat not in cache:
+        key = stat_key(stat)
+        cache[stat] = list(weights).index(key) if key in weights else None
+    return cache[stat]
+
+
+def piece_matrix(pieces, weights):
+    """Rows of per-stat values (columns in weights order) for GearPieces."""
+    cache = {}
+    rows = []
+    for piece in pieces:
+        row = [0.0] * len(weights)
+        for stat, value in piece.basic + piece.advanced:
+            col = _column(weights, stat, cache)
+            if col is not None:
+                row[col] += value
+        rows.append(row)
+    return rows
+
+
+def score_pieces(pieces, weights):
+    """
+    Score GearPieces against priority weights, as one batch: every stat column is scaled by
+    its largest value in the batch, so a score is sum(weight * value / column max) / sum(weight),
+    between 0 and 1. Returns a list of floats in the order of pieces.
+    """
+    pieces = list(pieces)
+    if not pieces or not weights:
+        return [0.0] * len(pieces)
+    w = list(weights.values())
+    total = sum(w)
+    rows = piece_matrix(pieces, weights)
+    if np is not None:
+        m = np.asarray(rows, dtype=float)
+        peak = m.max(axis=0)
+        peak[peak <= 0] = 1.0
+        return ((m / peak) @ np.asarray(w) / total).tolist()
+    peak = [max(row[j] for row in rows) for j in range(len(w))]
+    peak = [p if p > 0 else 1.0 for p in peak]
+    return [sum(wj * row[j] / peak[j] for j, wj in enumerate(w)) / total for row in rows]
+
+
+def score_builds(builds, weights):
+    """
+    Score every piece of every Build as one batch. Returns (build_scores, piece_scores):
+    the mean piece score per build, and per build the list of its pieces' scores
+    (in build.gear order).
+    """
+    builds = list(builds)
+    pieces = [piece for build in builds for piece in build.gear.values()]
+    scores = score_pieces(pieces, weights)
+    build_scores = []
+    piece_scores = []
+    i = 0
+    for build in builds:
+        n = len(build.gear)
+        piece_scores.append(scores[i:i + n])
+        build_scores.append(sum(scores[i:i + n]) / n if n else 0.0)
+        i += n
+    return build_scores, piece_scores
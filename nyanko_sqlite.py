@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+SQLite storage for Nyanko Protocol (NYANKO_STORAGE=sqlite): the same hot save dict as
+checklist.json, but completions and counters are kept per reset period instead of being
+thrown away at each reset, so streaks and missed tasks can be queried over years of history.
+
+Periods are the reset marks (ISO timestamps of the daily/weekly boundary), which sort in
+time order as plain strings.
+"""
+
+import os
+import json
+import sqlite3
+from datetime import datetime
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    section TEXT NOT NULL,
+    name TEXT NOT NULL,
+    cap INTEGER,            -- counter tasks: done once the count reaches cap (NULL otherwise)
+    days TEXT               -- daily tasks only on some weekdays: "4,5,6"
+);
+CREATE TABLE IF NOT EXISTS periods (
+    section TEXT NOT NULL,
+    period TEXT NOT NULL,
+    PRIMARY KEY (section, period)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS completions (
+    section TEXT NOT NULL,
+    period TEXT NOT NULL,
+    task TEXT NOT NULL,
+    at REAL NOT NULL,
+    PRIMARY KEY (section, period, task)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS completions_by_task ON completions (section, task, period);
+CREATE TABLE IF NOT EXISTS counters (
+    section TEXT NOT NULL,
+    period TEXT NOT NULL,
+    task TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (section, period, task)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS counters_by_task ON counters (section, task, period);
+CREATE TABLE IF NOT EXISTS actions (
+    seq INTEGER PRIMARY KEY,
+    t REAL NOT NULL,
+    op TEXT NOT NULL,
+    section TEXT NOT NULL,
+    task TEXT,
+    delta INTEGER NOT NULL
+);
+"""
+
+# Keys of the save dict not kept in meta: tables hold the first four, seq is per instance
+LOCAL_KEYS = ("daily", "weekly", "daily_count", "weekly_count", "seq")
+
+# Statements are constants with ? parameters, so sqlite3's statement cache prepares each once
+SQL_SET_META = "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+SQL_ADD_PERIOD = "INSERT OR IGNORE INTO periods (section, period) VALUES (?, ?)"
+SQL_CHECK = "INSERT OR IGNORE INTO completions (section, period, task, at) VALUES (?, ?, ?, ?)"
+SQL_UNCHECK = "DELETE FROM completions WHERE section = ? AND period = ? AND task = ?"
+SQL_SET_COUNT = (
+    "INSERT INTO counters (section, period, task, count) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (section, period, task) DO UPDATE SET count = excluded.count"
+)
+# Counter changes are applied as deltas, so two instances' increments add up
+SQL_ADD_COUNT = (
+    "INSERT INTO counters (section, period, task, count) VALUES (:section, :period, :task, max(0, :delta)) "
+    "ON CONFLICT (section, period, task) DO UPDATE SET count = max(0, count + :delta)"
+)
+SQL_GET_COUNT = "SELECT count FROM counters WHERE section = ? AND period = ? AND task = ?"
+SQL_ACTION = "INSERT INTO actions (t, op, section, task, delta) VALUES (?, ?, ?, ?, ?)"
+SQL_DONE_PERIODS = (
+    "SELECT period FROM completions WHERE section = ? AND task = ? AND period >= ? "
+    "UNION SELECT period FROM counters WHERE section = ? AND task = ? AND period >= ? AND count >= ?"
+)
+SQL_DONE_SINCE = (
+    "SELECT period, task FROM completions WHERE section = ? AND period >= ? "
+    "UNION SELECT c.period, c.task FROM counters c JOIN tasks t ON t.id = c.task "
+    "WHERE c.section = ? AND c.period >= ? AND c.count >= t.cap"
+)
+
+
+def _mark_key(section):
+    return section[0] + "_mark"     # "daily" -> "d_mark"
+
+
+class SqliteStore:
+    """
+    Save dict <-> SQLite (WAL mode). load()/save_state() round-trip the whole dict; record()
+    applies one journal-style action record incrementally. The connection is opened on first
+    use and belongs to the thread that opened it (the UI thread). A failed write is kept in
+    `error`; the next write then saves the whole state again. Until a load() succeeds
+    (`loaded`) nothing is written, so a database that could not be read is never overwritten
+    with state from elsewhere. changed() tells whether another connection (another running
+    instance) committed since we last loaded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.error = None
+        self.loaded = False
+        self._conn = None
+        self._data_version = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")   # WAL: durable at checkpoints, never corrupt
+            with conn:
+                conn.executescript(SCHEMA)
+                conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+            self._conn = conn
+        return self._conn
+
+    def changed(self):
+        """True once after another connection committed (PRAGMA data_version; our own commits don't count)."""
+        try:
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return False
+        if version == self._data_version:
+            return False
+        self._data_version = version
+        return True
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def sync_tasks(self, section, tasks):
+        """Store task definitions (names, caps, weekdays) for history queries."""
+        if not self.loaded:
+            return
+        rows = [(t["id"], section, t["name"], t.get("counter"),
+                 ",".join(map(str, t["days"])) if t.get("days") else None) for t in tasks]
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO tasks (id, section, name, cap, days) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET section = excluded.section, name = excluded.name, "
+                    "cap = excluded.cap, days = excluded.days", rows)
+        except sqlite3.Error as e:
+            self.error = e
+
+    # ── Save dict ──
+
+    def load(self):
+        """
+        The save dict for the current periods, or None for an empty database. If the database
+        can't be read this also returns None but leaves `loaded` False and the reason in `error`.
+        """
+        try:
+            self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            meta = dict(self.conn.execute("SELECT key, value FROM meta WHERE key != 'schema'"))
+            if not meta:
+                self.loaded = True
+                return None
+            data = {k: json.loads(v) for k, v in meta.items()}
+            for section in ("daily", "weekly"):
+                period = data.get(_mark_key(section), "")
+                data[section] = [task for task, in self.conn.execute(
+                    "SELECT task FROM completions WHERE section = ? AND period = ? ORDER BY at", (section, period))]
+                data[section + "_count"] = dict(self.conn.execute(
+                    "SELECT task, count FROM counters WHERE section = ? AND period = ?", (section, period)))
+        except (sqlite3.Error, ValueError) as e:
+            self.error = e
+            self.loaded = False
+            return None
+        self.loaded = True
+        return data
+
+    def save_state(self, data):
+        """Write the whole save dict: settings to meta, current-period checks and counts to tables."""
+        if not self.loaded:
+            return
+        try:
+            self._save_state(data)
+            self.error = None
+        except sqlite3.Error as e:
+            self.error = e
+
+    def _save_state(self, data):
+        conn = self.conn
+        with conn:
+            conn.executemany(SQL_SET_META, [(k, json.dumps(v)) for k, v in data.items() if k not in LOCAL_KEYS])
+            for section in ("daily", "weekly"):
+                period = data.get(_mark_key(section), "")
+                if period:
+                    conn.execute(SQL_ADD_PERIOD, (section, period))
+                checked = data.get(section) or []
+                stored = [task for task, in conn.execute(
+                    "SELECT task FROM completions WHERE section = ? AND period = ?", (section, period))]
+                conn.executemany(SQL_UNCHECK, [(section, period, task) for task in stored if task not in checked])
+                conn.executemany(SQL_CHECK, [(section, period, task, 0.0) for task in checked])
+                conn.executemany(SQL_SET_COUNT, [(section, period, task, n)
+                                                 for task, n in (data.get(section + "_count") or {}).items()])
+
+    def record(self, record, data):
+        """
+        Apply one action record (already applied to data) in one transaction; counters are
+        incremented in the database and data gets the merged count back.
+        """
+        if not self.loaded:
+            return
+        if self.error is not None:
+            self.save_state(data)   # an earlier write failed: store the whole current state instead
+            return
+        try:
+            self._record(record, data)
+        except sqlite3.Error as e:
+            self.error = e
+
+    def _record(self, record, data):
+        section = record["section"]
+        op = record["op"]
+        task = record.get("task")
+        conn = self.conn
+        with conn:
+            conn.execute(SQL_ACTION, (record["t"], op, section, task, record["delta"]))
+            if op == "set":
+                conn.executemany(SQL_SET_META, [(k, json.dumps(v)) for k, v in record["values"].items()])
+            elif op == "reset":
+                conn.execute(SQL_SET_META, (_mark_key(section), json.dumps(record["mark"])))
+                conn.execute(SQL_ADD_PERIOD, (section, record["mark"]))
+                # The new period starts empty, like data (it only has rows if the clock went back)
+                conn.execute("DELETE FROM completions WHERE section = ? AND period = ?", (section, record["mark"]))
+                conn.execute("DELETE FROM counters WHERE section = ? AND period = ?", (section, record["mark"]))
+            else:
+                period = data[_mark_key(section)]
+                if op == "check" and record["delta"] > 0:
+                    conn.execute(SQL_CHECK, (section, period, task, record["t"]))
+                elif op == "check":
+                    conn.execute(SQL_UNCHECK, (section, period, task))
+                elif op == "count":
+                    conn.execute(SQL_ADD_COUNT, {"section": section, "period": period, "task": task,
+                                                 "delta": record["delta"]})
+                    row = conn.execute(SQL_GET_COUNT, (section, period, task)).fetchone()
+                    data[section + "_count"][task] = row[0] if row else 0
+
+    # ── History ──
+
+    def first_period(self, section):
+        row = self.conn.execute("SELECT MIN(period) FROM periods WHERE section = ?", (section,)).fetchone()
+        return row[0] or ""
+
+    def streak(self, section, task, cap, marks):
+        """
+        Consecutive periods task was done, walking marks (newest first, only periods the task
+        was due). The current period counts once done but doesn't break the streak before that.
+        """
+        first = self.first_period(section)
+        done = {p for p, in self.conn.execute(SQL_DONE_PERIODS, (section, task, first, section, task, first, cap))}
+        n = 0
+        for i, mark in enumerate(marks):
+            if mark < first:
+                break
+            if mark in done:
+                n += 1
+            elif i > 0:
+                break
+        return n
+
+    def missed(self, section, marks):
+        """(period, task id) for every task due in one of marks but not done (oldest first)."""
+        first = self.first_period(section)
+        marks = sorted(m for m in marks if m >= first)
+        if not marks:
+            return []
+        done = set(self.conn.execute(SQL_DONE_SINCE, (section, marks[0], section, marks[0])))
+        tasks = self.conn.execute("SELECT id, days FROM tasks WHERE section = ? ORDER BY rowid", (section,)).fetchall()
+        result = []
+        for mark in marks:
+            weekday = datetime.fromisoformat(mark).weekday()
+            for tid, days in tasks:
+                if days and str(weekday) not in days.split(","):
+                    continue
+                if (mark, tid) not in done:
+                    result.append((mark, tid))
+        return result
+
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Persistence helpers for Nyanko Protocol: crash-safe file replacement, a write-behind
+saver that keeps JSON serialization and disk I/O off the UI thread, an append-only
+journal for small, frequent changes, and an advisory lock shared by every running instance.
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+SAVE_DEBOUNCE = 0.5     # seconds of quiet before a pending save is written
+SAVE_MAX_DELAY = 2.0    # ...but never hold a save back longer than this while changes keep coming
+REPLACE_RETRIES = 5     # os.replace can hit a transient PermissionError on Windows (AV, indexer)
+LOCK_TIMEOUT = 2.0      # give up waiting for another instance's lock after this (it is advisory)
+
+
+def file_stat(path):
+    """(size, mtime_ns, inode) of path, None if missing: equal stats mean nobody wrote it since."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class FileLock:
+    """
+    Advisory lock between processes on a side file: msvcrt.locking on Windows, fcntl.flock
+    elsewhere. Re-entrant within one thread, so use one FileLock per thread. If another
+    instance holds it for LOCK_TIMEOUT, the holder is assumed hung and the lock is skipped
+    (`timeouts` counts how often).
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.timeouts = 0
+        self._depth = 0
+        self._file = None
+
+    def _try_lock(self):
+        try:
+            if msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(self):
+        try:
+            if msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        self._depth += 1
+        if self._depth > 1:
+            return self
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, "a+b")
+        except OSError:
+            self._file = None   # no lock file (read-only folder?): run unlocked
+            return self
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock():
+            if time.monotonic() >= deadline:
+                self.timeouts += 1
+                self._file.close()
+                self._file = None
+                break
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            self._unlock()
+            self._file.close()
+            self._file = None
+
+
+def write_atomic(path, data):
+    """
+    Write bytes to path via a unique (mkstemp) temp file in the same folder, fsync, then
+    os.replace. The temp file is removed if anything fails, so concurrent writers (threads
+    or processes) never share or leave behind a temp file.
+    """
+    path = str(path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(tmp, path)
+                return
+            except PermissionError:
+                if attempt == REPLACE_RETRIES - 1:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def snapshot(data):
+    """
+    Copy of a save dict that the UI thread may keep mutating: the top level and every list/dict
+    one level down are copied. Deeper values (build records, gear slots) must be replaced,
+    never mutated in place, once saved.
+    """
+    return {k: v.copy() if isinstance(v, (dict, list)) else v for k, v in data.items()}
+
+
+def dump_json(data):
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def dump_json_compact(data):
+    """For large files nobody reads by hand (no indentation or spaces)."""
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+class WriteBehindSaver:
+    """
+    Debounced background saver for one file. save() only takes a snapshot and returns; a daemon
+    thread writes the newest snapshot once SAVE_DEBOUNCE passes without another save (or
+    SAVE_MAX_DELAY after the first unsaved change), with write_atomic. flush() blocks until
+    everything saved so far is on disk; call it before quitting or re-reading the file.
+    A failed write is kept in `error` and retried with the next save.
+    """
+
+    def __init__(self, path, serialize=dump_json, debounce=SAVE_DEBOUNCE, max_delay=SAVE_MAX_DELAY, lock=None):
+        self.path = path
+        self.serialize = serialize
+        self.lock = lock            # FileLock held around each write (used only by the writer thread)
+        self.stat = None            # file_stat right after our last write
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.error = None
+        self._cond = threading.Condition()
+        self._pending = None        # newest unsaved snapshot
+        self._first_change = 0.0    # monotonic time of the oldest unsaved change
+        self._last_change = 0.0
+        self._version = 0           # bumped per save(); _written catches up after each write
+        self._written = 0
+        self._flushing = False
+        self._closed = False
+        self._thread = None
+
+    def save(self, data):
+        with self._cond:
+            now = time.monotonic()
+            if self._pending is None:
+                self._first_change = now
+            self._pending = snapshot(data)
+            self._last_change = now
+            self._version += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    @property
+    def pending(self):
+        """True while a save() has not reached the disk yet."""
+        with self._cond:
+            return self._written < self._version
+
+    def flush(self, timeout=10.0):
+        """Write any pending save now and wait for it; returns False on timeout."""
+        with self._cond:
+            target = self._version
+            self._flushing = True
+            self._cond.notify_all()
+            ok = self._cond.wait_for(lambda: self._written >= target, timeout)
+            self._flushing = False
+            return ok
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _due(self):
+        """Seconds until the pending save should be written (0 = now)."""
+        if self._flushing or self._closed:
+            return 0.0
+        now = time.monotonic()
+        return max(0.0, min(self._last_change + self.debounce, self._first_change + self.max_delay) - now)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                delay = self._due()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                data = self._pending
+                version = self._version
+                self._pending = None
+            try:
+                blob = self.serialize(data)
+                if self.lock is not None:
+                    with self.lock:
+                        write_atomic(self.path, blob)
+                        self.stat = file_stat(self.path)
+                else:
+                    write_atomic(self.path, blob)
+                    self.stat = file_stat(self.path)
+                error = None
+            except (OSError, TypeError, ValueError) as e:
+                error = e
+            with self._cond:
+                self.error = error
+                if error is not None and self._pending is None:
+                    # Keep the data so the next save()/flush() retries it
+                    self._pending = data
+                    self._first_change = self._last_change = time.monotonic()
+                    if self._flushing:
+                        self._written = max(self._written, version)
+                else:
+                    self._written = max(self._written, version)
+                self._cond.notify_all()
+
+
+class Journal:
+    """
+    Append-only JSON-lines file of small records. append() writes one line and flushes it to
+    the OS (no fsync: it survives an app crash, and compaction replaces it with an fsynced
+    snapshot); a failed append is kept in `error` and retried with the next one. `offset`
+    is how far this process has read or written, so read_new() only parses what other
+    instances appended since. Reads skip a torn last line left by a crash mid-write.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.error = None
+        self.offset = 0
+        self._file = None
+        self._pending = []      # lines not written yet (after a failed append)
+        st = file_stat(path)
+        self.size = st[0] if st else 0
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "ab")
+        if self._file.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write(b"\n")     # start after a torn line, not inside it
+
+    def append(self, record):
+        """Write record; call read_new() first when other processes may append too."""
+        self._pending.append(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+        try:
+            if self._file is None:
+                self._open()
+            self._file.write(b"".join(self._pending))
+            self._file.flush()
+        except OSError as e:
+            self.error = e
+            self._close_file()
+            return
+        self._pending = []
+        self.error = None
+        self.size = self.offset = self._file.tell()
+
+    def _parse(self, lines):
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+    def read(self):
+        """Every intact record, in file order."""
+        try:
+            with open(self.path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            blob = b""
+        end = blob.rfind(b"\n") + 1
+        self.size = len(blob)
+        self.offset = end
+        return list(self._parse(blob[:end].splitlines()))
+
+    def read_new(self):
+        """
+        Records appended since offset (one stat when there are none), or None when the file
+        shrank, i.e. another instance compacted it and the caller must reload from the snapshot.
+        """
+        st = file_stat(self.path)
+        size = st[0] if st else 0
+        if size == self.offset:
+            return []
+        if size < self.offset:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        end = chunk.rfind(b"\n") + 1    # a line still being written is left for next time
+        self.offset += end
+        self.size = max(self.size, self.offset)
+        return list(self._parse(chunk[:end].splitlines()))
+
+    def clear(self):
+        """Empty the journal (after its records are folded into a snapshot on disk)."""
+        self._close_file()
+        with open(self.path, "wb"):
+            pass
+        self.size = self.offset = 0
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def close(self):
+        """Last try at writing failed appends, then close the file."""
+        if self._pending:
+            try:
+                if self._file is None:
+                    self._open()
+                self._file.write(b"".join(self._pending))
+                self._pending = []
+            except OSError:
+                pass
+        self._close_file()
@@ -0,0 +1,72 @@
+import asyncio
+import socket
+import threading
+import time
+import urllib.error
+
+import pytest
+
+import maxroll_scraper as ms
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(ms, "_retry_delay", lambda attempt, error: 0)
+
+
+def test_retries_network_errors_and_timeouts(monkeypatch):
+    errors = [urllib.error.URLError(ConnectionRefusedError()), socket.timeout("timed out")]
+    calls = []
+
+    def fetch_url(url, timeout):
+        calls.append(url)
+        if errors:
+            raise errors.pop(0)
+        return "<html></html>"
+
+    monkeypatch.setattr(ms, "fetch_url", fetch_url)
+    assert asyncio.run(ms.fetch_url_async("https://maxroll.gg/a")) == "<html></html>"
+    assert len(calls) == 3
+
+
+def test_does_not_retry_a_bad_url(monkeypatch):
+    calls = []
+
+    def fetch_url(url, timeout):
+        calls.append(url)
+        raise urllib.error.URLError("unsupported URL: %s" % url)
+
+    monkeypatch.setattr(ms, "fetch_url", fetch_url)
+    with pytest.raises(urllib.error.URLError):
+        asyncio.run(ms.fetch_url_async("ftp://maxroll.gg/a"))
+    assert len(calls) == 1
+
+
+def test_cancelled_fetch_keeps_its_slot_until_the_thread_returns(monkeypatch):
+    running = threading.Event()
+    finished = []
+
+    def fetch_url(url, timeout):
+        running.set()
+        time.sleep(0.3)
+        finished.append(url)
+        return ""
+
+    monkeypatch.setattr(ms, "fetch_url", fetch_url)
+
+    async def main():
+        sem = asyncio.Semaphore(1)
+
+        async def one():
+            async with sem:
+                await ms.fetch_url_async("https://maxroll.gg/a")
+
+        task = asyncio.ensure_future(one())
+        await asyncio.get_running_loop().run_in_executor(None, running.wait)
+        task.cancel()
+        async with sem:
+            # Only free once the worker thread is done with the fetch
+            assert finished == ["https://maxroll.gg/a"]
+        assert task.cancelled()
+
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+import os
+import threading
+
+import maxroll_scraper as ms
+
+
+def test_put_and_evict_concurrently_keep_fresh_entries(tmp_path):
+    # Two instances on one folder, like the prefetch thread and the refresher (or two windows)
+    writers = [ms.HTTPCache(root=str(tmp_path)), ms.HTTPCache(root=str(tmp_path))]
+    evictor = ms.HTTPCache(root=str(tmp_path))
+    stop = threading.Event()
+    missing = []
+
+    def evict_loop():
+        while not stop.is_set():
+            evictor.evict()
+
+    def put_loop(cache, n):
+        for i in range(150):
+            url = "https://maxroll.gg/guide-%d-%d" % (n, i % 5)
+            body = ("%d-%d " % (n, i)).encode() * 200
+            cache.put(url, body, {"ETag": '"%d"' % i})
+            if cache.get(url) is None or cache.read_body(url) != body:
+                missing.append(url)
+
+    threads = [threading.Thread(target=evict_loop) for _ in range(2)]
+    threads += [threading.Thread(target=put_loop, args=(cache, n)) for n, cache in enumerate(writers)]
+    for t in threads:
+        t.start()
+    for t in threads[2:]:
+        t.join()
+    stop.set()
+    for t in threads[:2]:
+        t.join()
+    assert missing == []
+
+
+def test_evict_keeps_a_body_whose_meta_is_not_written_yet(tmp_path):
+    cache = ms.HTTPCache(root=str(tmp_path))
+    _, body_path = cache._paths("https://maxroll.gg/guide")
+    with open(body_path, "wb") as f:
+        f.write(b"body")
+    cache.evict()
+    assert tmp_path.joinpath(body_path).exists()
+
+
+def test_evict_drops_expired_and_least_recently_used(tmp_path):
+    cache = ms.HTTPCache(root=str(tmp_path))
+    for i in range(3):
+        url = "https://maxroll.gg/%d" % i
+        cache.put(url, b"x" * 100, {})
+        os.utime(cache._paths(url)[1], (1000 + i, 1000 + i))
+    cache.max_bytes = 250
+    cache.evict()
+    assert cache.get("https://maxroll.gg/0") is None
+    assert cache.get("https://maxroll.gg/2") is not None
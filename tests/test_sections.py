@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import bench_maxroll
+import maxroll_scraper as ms
+
+MB = 1024 * 1024
+
+
+def _timed(text):
+    t0 = time.perf_counter()
+    result = ms.extract_sections_from_text(text)
+    return result, time.perf_counter() - t0
+
+
+def test_food_and_serum():
+    text = "Food: Grilled Seafood Platter Serum: Azure Focus Serum To learn more about life skills"
+    assert ms.extract_sections_from_text(text) == {
+        "gearing": "", "food": "Grilled Seafood Platter", "serum": "Azure Focus Serum",
+    }
+
+
+def test_food_needs_a_serum_label():
+    text = "Food: only food nothing else. Much later text mentions serum recovery."
+    assert ms.extract_sections_from_text(text)["food"] == ""
+
+
+def test_food_without_serum_label_does_not_block_a_later_match():
+    text = ("Food: only food nothing else. Much later text mentions serum recovery. "
+            + "filler text " * 60
+            + "Food: Grilled Seafood Platter Serum: Azure Focus Serum To learn more")
+    sections = ms.extract_sections_from_text(text)
+    assert sections["food"] == "Grilled Seafood Platter"
+    assert sections["serum"] == "Azure Focus Serum"
+
+
+def test_food_with_serum_beyond_the_window_is_dropped():
+    text = "Food: " + "very long dish name " * 30 + "Serum: Azure Focus Serum"
+    sections = ms.extract_sections_from_text(text)
+    assert sections["food"] == ""
+    assert sections["serum"] == "Azure Focus Serum"
+
+
+@pytest.mark.parametrize("name", sorted(bench_maxroll.ADVERSARIAL))
+def test_adversarial_10mb_is_linear(name):
+    unit = bench_maxroll.ADVERSARIAL[name]
+    small, t_small = _timed(unit * (MB // len(unit)))
+    large, t_large = _timed(unit * (10 * MB // len(unit)))
+    # No complete match anywhere; only the open-ended Serum value is cut at its window
+    assert large["gearing"] == "" and large["food"] == ""
+    if name == "serum_without_end":
+        assert large["serum"] == small["serum"] != ""
+        assert len(large["serum"]) <= 200
+    else:
+        assert large["serum"] == ""
+    # 10x the text should cost about 10x the time; quadratic scanning would be about 100x
+    assert t_large < 30 * max(t_small, 0.01), "%.2fs at 1 MB, %.2fs at 10 MB" % (t_small, t_large)
@@ -0,0 +1,43 @@
+import os
+import threading
+
+import pytest
+
+import nyanko_storage
+
+
+def test_write_atomic_from_many_threads(tmp_path):
+    path = tmp_path / "save.json"
+    blobs = [(b"%d" % n) * 4096 for n in range(8)]
+    errors = []
+
+    def writer(blob):
+        try:
+            for _ in range(50):
+                nyanko_storage.write_atomic(path, blob)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(blob,)) for blob in blobs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert path.read_bytes() in blobs
+    assert os.listdir(tmp_path) == ["save.json"]
+
+
+@pytest.mark.parametrize("exc", [OSError("disk full"), KeyboardInterrupt()])
+def test_write_atomic_removes_temp_file_on_failure(tmp_path, monkeypatch, exc):
+    path = tmp_path / "save.json"
+    path.write_bytes(b"old")
+
+    def fail(src, dst):
+        raise exc
+
+    monkeypatch.setattr(nyanko_storage.os, "replace", fail)
+    with pytest.raises(type(exc)):
+        nyanko_storage.write_atomic(path, b"new")
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["save.json"]